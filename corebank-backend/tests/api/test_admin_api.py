@@ -1,48 +1,41 @@
 #!/usr/bin/env python3
 """
 Test script for admin API endpoints
+
+Run from corebank-backend with pytest or ``python -m tests.api.test_admin_api``.
 """
 
-import requests
-import json
+import asyncio
+import os
 
-BASE_URL = "http://localhost:8000/api/v1"
+import httpx
+import pytest
+
+from tests.helpers import API_BASE_URL, fetch_admin_token, short_body
 
-def get_admin_token():
-    """Get admin token for testing"""
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
-    
-    response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        print(f"Login failed: {response.status_code} - {response.text}")
-        return None
 
-def test_get_users(token, status='active'):
+async def test_get_users(admin_client, status='active'):
     """Test getting users list"""
-    headers = {"Authorization": f"Bearer {token}"}
     params = {"status": status}
 
-    response = requests.get(f"{BASE_URL}/admin/users", headers=headers, params=params)
-    print(f"Get {status} users: {response.status_code}")
+    response = await admin_client.get("/admin/users", params=params)
+    # Print the whole block in one call so concurrent runs don't interleave
+    lines = [f"Get {status} users: {response.status_code}"]
+    data = None
     if response.status_code == 200:
         data = response.json()
-        print(f"Found {len(data['items'])} {status} users")
+        lines.append(f"Found {len(data['items'])} {status} users")
         for user in data['items']:
             deleted_status = " (DELETED)" if user.get('deleted_at') else ""
-            print(f"  - {user['username']} ({user['role']}) - Active: {user.get('is_active', 'N/A')}{deleted_status}")
+            lines.append(f"  - {user['username']} ({user['role']}) - Active: {user.get('is_active', 'N/A')}{deleted_status}")
     else:
-        print(f"Error: {response.text}")
+        lines.append(f"Error: {short_body(response)}")
+    print("\n".join(lines))
+    return data
 
-def test_get_user_detail(token, user_id):
+async def test_get_user_detail(admin_client, user_id):
     """Test getting user detail"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    response = requests.get(f"{BASE_URL}/admin/users/{user_id}", headers=headers)
+    response = await admin_client.get(f"/admin/users/{user_id}")
     print(f"Get user detail: {response.status_code}")
     if response.status_code == 200:
         user = response.json()
@@ -51,119 +44,139 @@ def test_get_user_detail(token, user_id):
         print(f"  Balance: {user.get('total_balance', '0.00')}")
         print(f"  Investments: {user.get('investment_count', 0)}")
     else:
-        print(f"Error: {response.text}")
+        print(f"Error: {short_body(response)}")
 
 
 
-def test_soft_delete_user(token, user_id):
-    """Test soft deleting user"""
-    headers = {"Authorization": f"Bearer {token}"}
+async def soft_delete_user(client, user_id):
+    """Soft delete a user and return the raw response"""
     data = {
         "reason": "API测试 - 软删除测试"
     }
 
-    response = requests.delete(f"{BASE_URL}/admin/users/{user_id}", headers=headers, json=data)
+    # httpx only accepts a body on DELETE through the generic request()
+    return await client.request("DELETE", f"/admin/users/{user_id}", json=data)
+
+async def test_soft_delete_user(admin_client, user_id):
+    """Test soft deleting user"""
+    response = await soft_delete_user(admin_client, user_id)
     print(f"Soft delete user: {response.status_code}")
     if response.status_code == 200:
         result = response.json()
         print(f"Soft delete result: {result.get('message', 'Success')}")
     else:
-        print(f"Error: {response.text}")
+        print(f"Error: {short_body(response)}")
 
-def test_restore_user(token, user_id):
+async def test_restore_user(admin_client, deleted_user_id):
     """Test restoring user"""
-    headers = {"Authorization": f"Bearer {token}"}
     data = {
         "reason": "API测试 - 恢复测试"
     }
 
-    response = requests.post(f"{BASE_URL}/admin/users/{user_id}/restore", headers=headers, json=data)
+    response = await admin_client.post(f"/admin/users/{deleted_user_id}/restore", json=data)
     print(f"Restore user: {response.status_code}")
     if response.status_code == 200:
         user = response.json()
         print(f"Restored user: {user['username']} - Active: {user.get('is_active', 'N/A')}")
     else:
-        print(f"Error: {response.text}")
+        print(f"Error: {short_body(response)}")
 
-def create_test_user():
+async def create_test_user(client):
     """Create a test user for deletion testing"""
-    import time
-    # First register a test user with timestamp to ensure uniqueness
-    timestamp = int(time.time())
+    # Random suffix keeps users unique even when several are created per second
     register_data = {
-        "username": f"test_delete_user_{timestamp}",
+        "username": f"test_delete_user_{os.urandom(4).hex()}",
         "password": "TestPassword123!"
     }
 
-    response = requests.post(f"{BASE_URL}/auth/register", json=register_data)
+    response = await client.post("/auth/register", json=register_data)
     if response.status_code == 201:
         user = response.json()
         print(f"Created test user: {user['username']} (ID: {user['id']})")
         return user['id']
     else:
-        print(f"Failed to create test user: {response.text}")
+        print(f"Failed to create test user: {short_body(response)}")
         return None
 
-def main():
+@pytest.fixture
+async def user_id(admin_client):
+    """Freshly registered user for the detail and soft delete tests"""
+    user_id = await create_test_user(admin_client)
+    if user_id is None:
+        pytest.skip("Could not register a test user")
+    return user_id
+
+@pytest.fixture
+async def deleted_user_id(admin_client, user_id):
+    """Registered user that has already been soft deleted, for the restore test"""
+    response = await soft_delete_user(admin_client, user_id)
+    if not 200 <= response.status_code < 300:
+        pytest.skip(f"Could not soft delete test user: {short_body(response)}")
+    return user_id
+
+async def main():
     print("Testing Admin API endpoints...")
 
-    # Get admin token
-    token = get_admin_token()
-    if not token:
+    # Same cached login the pytest fixtures use
+    try:
+        token = fetch_admin_token()
+    except httpx.HTTPError as e:
+        print(f"Login failed: {e}")
         return
 
     print(f"Got admin token: {token[:50]}...")
-
-    # Test get users
-    print("\n1. Testing get users...")
-    test_get_users(token)
-    
-    # Get first user for testing
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{BASE_URL}/admin/users", headers=headers)
-    if response.status_code == 200:
-        users = response.json()['items']
-        if users:
-            test_user = users[0]
-            user_id = test_user['id']
-            
-            print(f"\n2. Testing get user detail for {test_user['username']}...")
-            test_get_user_detail(token, user_id)
-            
-            # Find a non-admin user for testing
-            test_user = None
-            for user in users:
-                if user['role'] != 'admin':
-                    test_user = user
-                    break
-
-            if test_user:
-                print(f"\n3. Found test user: {test_user['username']}")
-            else:
-                print(f"\n3. No non-admin users found for testing")
-
-    # Test soft delete with a new user
-    print(f"\n5. Testing soft delete functionality...")
-    test_user_id = create_test_user()
-    if test_user_id:
-        print(f"\n6. Soft deleting test user...")
-        test_soft_delete_user(token, test_user_id)
-
-        # Verify user is no longer in active list
-        print(f"\n7. Verifying user is deleted from active list...")
-        test_get_users(token, 'active')
-
-        # Check deleted users list
-        print(f"\n8. Checking deleted users list...")
-        test_get_users(token, 'deleted')
-
-        # Test restore functionality
-        print(f"\n9. Testing restore functionality...")
-        test_restore_user(token, test_user_id)
-
-        # Verify user is back in active list
-        print(f"\n10. Verifying user is restored to active list...")
-        test_get_users(token, 'active')
+    async with httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        # Test get users
+        print("\n1. Testing get users...")
+        data = await test_get_users(client)
+
+        # Reuse the listing above for the detail tests
+        if data is not None:
+            users = data['items']
+            if users:
+                test_user = users[0]
+                user_id = test_user['id']
+
+                print(f"\n2. Testing get user detail for {test_user['username']}...")
+                await test_get_user_detail(client, user_id)
+
+                # Find a non-admin user for testing
+                test_user = next((user for user in users if user['role'] != 'admin'), None)
+
+                if test_user:
+                    print(f"\n3. Found test user: {test_user['username']}")
+                else:
+                    print(f"\n3. No non-admin users found for testing")
+
+        # Test soft delete with a new user
+        # create -> delete -> restore must stay sequential
+        print(f"\n5. Testing soft delete functionality...")
+        test_user_id = await create_test_user(client)
+        if test_user_id:
+            print(f"\n6. Soft deleting test user...")
+            response = await soft_delete_user(client, test_user_id)
+            print(f"Soft delete user: {response.status_code}")
+            if not 200 <= response.status_code < 300:
+                print(f"Error: {short_body(response)}")
+                return
+
+            # Active and deleted listings are independent reads
+            print(f"\n7-8. Verifying user moved from active list to deleted list...")
+            await asyncio.gather(
+                test_get_users(client, 'active'),
+                test_get_users(client, 'deleted'),
+            )
+
+            # Test restore functionality
+            print(f"\n9. Testing restore functionality...")
+            await test_restore_user(client, test_user_id)
+
+            # Verify user is back in active list
+            print(f"\n10. Verifying user is restored to active list...")
+            await test_get_users(client, 'active')
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
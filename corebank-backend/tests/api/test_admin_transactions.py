@@ -1,142 +1,160 @@
 #!/usr/bin/env python3
 """
 Test script for admin transaction monitoring API endpoints
+
+Run from corebank-backend with pytest or
+``python -m tests.api.test_admin_transactions``.
 """
 
-import requests
-import json
+import asyncio
+from typing import Optional
 
-BASE_URL = "http://localhost:8000/api/v1"
+import httpx
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from tests.helpers import API_BASE_URL, fetch_admin_token, short_body
+
+
+class AdminAccount(BaseModel):
+    """Fields of an admin account listing row used by this script"""
+    id: str
+    account_number: str
+    account_type: str
+    username: Optional[str] = None
+    real_name: Optional[str] = None
+
+
+class AdminTransaction(BaseModel):
+    """Fields of an admin transaction row used by this script"""
+    transaction_type: str
+    amount: str
+    username: Optional[str] = None
+    real_name: Optional[str] = None
 
-def get_admin_token():
-    """Get admin token for testing"""
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
-    
-    response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        print(f"Login failed: {response.status_code} - {response.text}")
-        return None
 
-def test_get_all_accounts(token):
+class TransactionPage(BaseModel):
+    """Paginated admin transaction listing"""
+    items: list[AdminTransaction]
+    total_count: int
+
+
+# Validate straight from the response bytes against the expected shape
+ACCOUNT_LIST = TypeAdapter(list[AdminAccount])
+
+async def test_get_all_accounts(admin_client):
     """Test getting all accounts"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    response = requests.get(f"{BASE_URL}/admin/accounts", headers=headers)
-    print(f"Get all accounts: {response.status_code}")
+    response = await admin_client.get("/admin/accounts")
+    # Each test prints its block in one call so concurrent runs don't interleave
+    lines = [f"Get all accounts: {response.status_code}"]
     if response.status_code == 200:
-        accounts = response.json()
-        print(f"Found {len(accounts)} accounts")
+        accounts = ACCOUNT_LIST.validate_json(response.content)
+        lines.append(f"Found {len(accounts)} accounts")
         for account in accounts[:3]:  # Show first 3
-            real_name = account.get('real_name')
-            username = account.get('username', 'Unknown')
-            owner_name = real_name if real_name else username
-            print(f"  - {account['account_number']} ({account['account_type']}) - {owner_name}")
+            owner_name = account.real_name or account.username or 'Unknown'
+            lines.append(f"  - {account.account_number} ({account.account_type}) - {owner_name}")
+        print("\n".join(lines))
         return accounts
     else:
-        print(f"Error: {response.text}")
+        lines.append(f"Error: {short_body(response)}")
+        print("\n".join(lines))
         return []
 
-def test_get_all_transactions(token, account_id=None):
+async def test_get_all_transactions(admin_client, account_id=None):
     """Test getting all transactions"""
-    headers = {"Authorization": f"Bearer {token}"}
     params = {"page": 1, "page_size": 10}
-    
+
     if account_id:
         params["account_id"] = account_id
-    
-    response = requests.get(f"{BASE_URL}/admin/transactions", headers=headers, params=params)
-    print(f"Get all transactions: {response.status_code}")
+
+    response = await admin_client.get("/admin/transactions", params=params)
+    lines = [f"Get all transactions: {response.status_code}"]
     if response.status_code == 200:
-        data = response.json()
-        print(f"Found {data['total_count']} total transactions, showing {len(data['items'])}")
-        for transaction in data['items'][:3]:  # Show first 3
-            real_name = transaction.get('real_name')
-            username = transaction.get('username', 'Unknown')
-            user_name = real_name if real_name else username
-            print(f"  - {transaction['transaction_type']} ¥{transaction['amount']} - {user_name}")
+        data = TransactionPage.model_validate_json(response.content)
+        lines.append(f"Found {data.total_count} total transactions, showing {len(data.items)}")
+        for transaction in data.items[:3]:  # Show first 3
+            user_name = transaction.real_name or transaction.username or 'Unknown'
+            lines.append(f"  - {transaction.transaction_type} ¥{transaction.amount} - {user_name}")
+        print("\n".join(lines))
         return data
     else:
-        print(f"Error: {response.text}")
+        lines.append(f"Error: {short_body(response)}")
+        print("\n".join(lines))
         return None
 
-def test_get_transaction_statistics(token):
+async def test_get_transaction_statistics(admin_client):
     """Test getting transaction statistics"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    response = requests.get(f"{BASE_URL}/admin/transaction-statistics", headers=headers)
-    print(f"Get transaction statistics: {response.status_code}")
+    response = await admin_client.get("/admin/transaction-statistics")
+    lines = [f"Get transaction statistics: {response.status_code}"]
     if response.status_code == 200:
         stats = response.json()
-        print("Transaction Statistics:")
-        print(f"  - Total transactions: {stats.get('total_transactions', 0)}")
-        print(f"  - Deposits: {stats.get('deposit_count', 0)}")
-        print(f"  - Withdrawals: {stats.get('withdrawal_count', 0)}")
-        print(f"  - Transfers: {stats.get('transfer_count', 0)}")
-        print(f"  - Last 24h: {stats.get('transactions_24h', 0)}")
+        lines.extend([
+            "Transaction Statistics:",
+            f"  - Total transactions: {stats.get('total_transactions', 0)}",
+            f"  - Deposits: {stats.get('deposit_count', 0)}",
+            f"  - Withdrawals: {stats.get('withdrawal_count', 0)}",
+            f"  - Transfers: {stats.get('transfer_count', 0)}",
+            f"  - Last 24h: {stats.get('transactions_24h', 0)}",
+        ])
+        print("\n".join(lines))
         return stats
     else:
-        print(f"Error: {response.text}")
+        lines.append(f"Error: {short_body(response)}")
+        print("\n".join(lines))
         return None
 
-def test_search_transactions(token, search_term):
+@pytest.mark.parametrize("search_term", ["test"])
+async def test_search_transactions(admin_client, search_term):
     """Test searching transactions by user"""
-    headers = {"Authorization": f"Bearer {token}"}
     params = {
         "page": 1,
         "page_size": 5,
         "user_search": search_term
     }
-    
-    response = requests.get(f"{BASE_URL}/admin/transactions", headers=headers, params=params)
-    print(f"Search transactions for '{search_term}': {response.status_code}")
+
+    response = await admin_client.get("/admin/transactions", params=params)
+    lines = [f"Search transactions for '{search_term}': {response.status_code}"]
     if response.status_code == 200:
-        data = response.json()
-        print(f"Found {data['total_count']} matching transactions")
-        for transaction in data['items']:
-            real_name = transaction.get('real_name')
-            username = transaction.get('username', 'Unknown')
-            user_name = real_name if real_name else username
-            print(f"  - {transaction['transaction_type']} ¥{transaction['amount']} - {user_name}")
+        data = TransactionPage.model_validate_json(response.content)
+        lines.append(f"Found {data.total_count} matching transactions")
+        for transaction in data.items:
+            user_name = transaction.real_name or transaction.username or 'Unknown'
+            lines.append(f"  - {transaction.transaction_type} ¥{transaction.amount} - {user_name}")
+        print("\n".join(lines))
         return data
     else:
-        print(f"Error: {response.text}")
+        lines.append(f"Error: {short_body(response)}")
+        print("\n".join(lines))
         return None
 
-def main():
+async def main():
     print("Testing Admin Transaction Monitoring API endpoints...")
-    
-    # Get admin token
-    token = get_admin_token()
-    if not token:
+
+    # Same cached login the pytest fixtures use
+    try:
+        token = fetch_admin_token()
+    except httpx.HTTPError as e:
+        print(f"Login failed: {e}")
         return
-    
+
     print(f"Got admin token: {token[:50]}...")
-    
-    # Test get all accounts
-    print("\n1. Testing get all accounts...")
-    accounts = test_get_all_accounts(token)
-    
-    # Test get transaction statistics
-    print("\n2. Testing get transaction statistics...")
-    test_get_transaction_statistics(token)
-    
-    # Test get all transactions
-    print("\n3. Testing get all transactions...")
-    test_get_all_transactions(token)
-    
-    # Test get transactions for specific account
-    if accounts:
-        print(f"\n4. Testing get transactions for specific account...")
-        test_get_all_transactions(token, accounts[0]['id'])
-    
-    # Test search transactions
-    print(f"\n5. Testing search transactions...")
-    test_search_transactions(token, "test")
+    async with httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        # Accounts, statistics, transaction listing and search are independent
+        print("\n1-3, 5. Testing accounts, statistics, transactions and search concurrently...")
+        accounts, _, _, _ = await asyncio.gather(
+            test_get_all_accounts(client),
+            test_get_transaction_statistics(client),
+            test_get_all_transactions(client),
+            test_search_transactions(client, "test"),
+        )
+
+        # Test get transactions for specific account
+        if accounts:
+            print(f"\n4. Testing get transactions for specific account...")
+            await test_get_all_transactions(client, accounts[0].id)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
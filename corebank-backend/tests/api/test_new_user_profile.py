@@ -1,20 +1,42 @@
 #!/usr/bin/env python3
 """
 测试新用户的个人信息默认显示
+
+在 corebank-backend 目录下运行：python -m tests.api.test_new_user_profile
 """
 
-import requests
-import json
-import random
-import string
+import logging
+import secrets
+
+import orjson
+
+from tests.helpers import create_session
 
 BASE_URL = "http://localhost:8000/api/v1"
 
+log = logging.getLogger(__name__)
+
+# 需要检查的个人信息字段及其显示名称（按输出顺序）
+PROFILE_FIELDS = (
+    ('real_name', '真实姓名'),
+    ('english_name', '英文姓名'),
+    ('id_type', '证件类型'),
+    ('id_number', '证件号码'),
+    ('country', '国家/地区'),
+    ('ethnicity', '民族'),
+    ('gender', '性别'),
+    ('birth_date', '出生日期'),
+    ('birth_place', '出生地'),
+    ('phone', '手机号码'),
+    ('email', '邮箱地址'),
+    ('address', '联系地址'),
+)
+
 def generate_random_username():
     """生成随机用户名"""
-    return 'testuser_' + ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+    return 'testuser_' + secrets.token_hex(4)
 
-def register_new_user():
+def register_new_user(session):
     """注册新用户"""
     username = generate_random_username()
     password = "MySecure123!"
@@ -24,89 +46,79 @@ def register_new_user():
         "password": password
     }
     
-    print(f"📝 注册新用户: {username}")
-    response = requests.post(f"{BASE_URL}/auth/register", json=register_data)
+    log.info("📝 注册新用户: %s", username)
+    response = session.post(f"{BASE_URL}/auth/register", json=register_data)
     if response.status_code == 201:
-        print(f"✅ 用户注册成功")
+        log.info("✅ 用户注册成功")
         return username, password
     else:
-        print(f"❌ 用户注册失败: {response.text}")
+        log.error("❌ 用户注册失败: %s", response.text)
         return None, None
 
-def login_user(username, password):
+def login_user(session, username, password):
     """登录用户"""
     login_data = {
         "username": username,
         "password": password
     }
     
-    response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
-    if response.status_code == 200:
-        token = response.json()["access_token"]
-        print(f"✅ 用户登录成功")
+    response = session.post(f"{BASE_URL}/auth/login", json=login_data)
+    if 200 <= response.status_code < 300:
+        token = orjson.loads(response.content)["access_token"]
+        log.info("✅ 用户登录成功")
         return token
     else:
-        print(f"❌ 用户登录失败: {response.text}")
+        log.error("❌ 用户登录失败: %s", response.text)
         return None
 
-def get_profile(token):
-    """获取当前用户个人信息"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    print("\n📋 获取新用户的个人信息...")
-    response = requests.get(f"{BASE_URL}/auth/me/profile", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"  - 用户ID: {data['id']}")
-        print(f"  - 用户名: {data['username']}")
-        
-        # Check profile fields
-        profile_fields = {
-            'real_name': '真实姓名',
-            'english_name': '英文姓名',
-            'id_type': '证件类型',
-            'id_number': '证件号码',
-            'country': '国家/地区',
-            'ethnicity': '民族',
-            'gender': '性别',
-            'birth_date': '出生日期',
-            'birth_place': '出生地',
-            'phone': '手机号码',
-            'email': '邮箱地址',
-            'address': '联系地址'
-        }
+def get_profile(session):
+    """获取当前用户个人信息（会话已携带认证头）"""
+    log.info("\n📋 获取新用户的个人信息...")
+    response = session.get(f"{BASE_URL}/auth/me/profile")
+    if 200 <= response.status_code < 300:
+        data = orjson.loads(response.content)
+        log.info("  - 用户ID: %s", data['id'])
+        log.info("  - 用户名: %s", data['username'])
         
-        print("\n  个人信息字段:")
-        for field, label in profile_fields.items():
+        # 所有字段拼成一段文本，一次输出
+        lines = ["\n  个人信息字段:"]
+        for field, label in PROFILE_FIELDS:
             value = data.get(field)
             if value is None:
-                print(f"    - {label}: null (应显示为'未设置')")
+                lines.append(f"    - {label}: null (应显示为'未设置')")
             else:
-                print(f"    - {label}: {value}")
+                lines.append(f"    - {label}: {value}")
+        log.info("\n".join(lines))
         
         return data
     else:
-        print(f"❌ 获取个人信息失败: {response.text}")
+        log.error("❌ 获取个人信息失败: %s", response.text)
         return None
 
 def main():
-    print("🧪 测试新用户个人信息默认显示")
+    log.info("🧪 测试新用户个人信息默认显示")
     
-    # 注册新用户
-    username, password = register_new_user()
-    if not username:
-        return
-    
-    # 登录用户
-    token = login_user(username, password)
-    if not token:
-        return
-    
-    # 获取个人信息
-    get_profile(token)
-    
-    print("\n✅ 测试完成")
-    print("💡 请在前端页面检查个人信息是否显示为'未设置'")
+    session = create_session()
+    try:
+        # 注册新用户
+        username, password = register_new_user(session)
+        if not username:
+            return
+        
+        # 登录用户
+        token = login_user(session, username, password)
+        if not token:
+            return
+        session.headers["Authorization"] = f"Bearer {token}"
+        
+        # 获取个人信息
+        get_profile(session)
+        
+        log.info("\n✅ 测试完成")
+        log.info("💡 请在前端页面检查个人信息是否显示为'未设置'")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
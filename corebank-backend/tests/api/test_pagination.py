@@ -1,116 +1,165 @@
 #!/usr/bin/env python3
 """
 测试用户管理分页功能
+
+默认模式下第2、3页由一次批量请求在本地切分，其分页字段是本地推算的，
+只有 --strict-pagination 才会逐页请求并检查服务端返回的分页字段。
+
+在 corebank-backend 目录下运行：python -m tests.api.test_pagination
 """
 
-import requests
-import json
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
-BASE_URL = "http://localhost:8000/api/v1"
+import httpx
+import orjson
 
-def login_admin():
-    """登录管理员账户"""
-    login_data = {
-        "username": "admin",
-        "password": "admin123"
-    }
-    
-    response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
-    if response.status_code == 200:
-        token = response.json()["access_token"]
-        print(f"✅ 管理员登录成功")
-        return token
-    else:
-        print(f"❌ 管理员登录失败: {response.text}")
-        return None
+from tests.helpers import API_BASE_URL, create_session, fetch_admin_token, short_body
 
-def test_pagination(token):
-    """测试分页功能"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    print("\n🔍 测试分页功能...")
+PAGE_SIZE = 5
+SEARCH_TERMS = ("test", "admin")
+
+log = logging.getLogger(__name__)
+
+def users_url(page, page_size=PAGE_SIZE, search=None):
+    """用户列表接口URL"""
+    if search:
+        return f"{API_BASE_URL}/admin/users?search={search}&page={page}&page_size={page_size}"
+    return f"{API_BASE_URL}/admin/users?page={page}&page_size={page_size}"
+
+def fetch_concurrently(session, urls):
+    """并发请求多个相互独立的URL，返回 {url: response}"""
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        return dict(zip(urls, executor.map(session.get, urls), strict=True))
+
+def check_first_page(session):
+    """测试分页功能，返回 (第1页之后还需要验证的页码, 总页数)"""
+    log.info("\n🔍 测试分页功能...")
     
     # 测试第1页
-    print("\n📄 测试第1页:")
-    response = requests.get(f"{BASE_URL}/admin/users?page=1&page_size=5", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"  - 第1页用户数: {len(data['items'])}")
-        print(f"  - 总用户数: {data['total_count']}")
-        print(f"  - 总页数: {data['total_pages']}")
-        print(f"  - 有下一页: {data['has_next']}")
+    log.info("\n📄 测试第1页:")
+    response = session.get(users_url(1))
+    if 200 <= response.status_code < 300:
+        data = orjson.loads(response.content)
+        log.info("  - 第1页用户数: %s", len(data['items']))
+        log.info("  - 总用户数: %s", data['total_count'])
+        log.info("  - 总页数: %s", data['total_pages'])
+        log.info("  - 有下一页: %s", data['has_next'])
         
-        # 测试第2页
+        follow_pages = []
         if data['has_next']:
-            print("\n📄 测试第2页:")
-            response2 = requests.get(f"{BASE_URL}/admin/users?page=2&page_size=5", headers=headers)
-            if response2.status_code == 200:
-                data2 = response2.json()
-                print(f"  - 第2页用户数: {len(data2['items'])}")
-                print(f"  - 有上一页: {data2['has_previous']}")
-                print(f"  - 有下一页: {data2['has_next']}")
-            else:
-                print(f"  ❌ 第2页请求失败: {response2.text}")
-        
-        # 测试第3页
+            follow_pages.append(2)
         if data['total_pages'] >= 3:
-            print("\n📄 测试第3页:")
-            response3 = requests.get(f"{BASE_URL}/admin/users?page=3&page_size=5", headers=headers)
-            if response3.status_code == 200:
-                data3 = response3.json()
-                print(f"  - 第3页用户数: {len(data3['items'])}")
-                print(f"  - 有上一页: {data3['has_previous']}")
-                print(f"  - 有下一页: {data3['has_next']}")
-            else:
-                print(f"  ❌ 第3页请求失败: {response3.text}")
+            follow_pages.append(3)
+        return follow_pages, data['total_pages']
     else:
-        print(f"❌ 第1页请求失败: {response.text}")
+        log.error("❌ 第1页请求失败: %s", short_body(response))
+        return [], 0
 
-def test_search(token):
-    """测试搜索功能"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    print("\n🔍 测试搜索功能...")
-    
-    # 搜索 "test"
-    print("\n🔎 搜索 'test':")
-    response = requests.get(f"{BASE_URL}/admin/users?search=test&page=1&page_size=10", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"  - 搜索结果数: {len(data['items'])}")
-        print(f"  - 总匹配数: {data['total_count']}")
-        for user in data['items']:
-            print(f"    - {user['username']}")
+def page_from_batch(items, page, total_pages):
+    """从一次拉取的用户列表中在本地切出第page页，并按总页数补齐分页字段"""
+    start = (page - 1) * PAGE_SIZE
+    return {
+        'items': items[start:start + PAGE_SIZE],
+        'has_previous': page > 1,
+        'has_next': page < total_pages,
+    }
+
+def print_page(page, data=None, error=None, local=False):
+    """打印第2、3页的分页结果
+
+    local 为 True 时数据来自 page_from_batch，输出中标明分页字段为本地推算。
+    """
+    if local:
+        log.info("\n📄 第%s页（批量请求后本地切分，未经服务端分页验证）:", page)
     else:
-        print(f"❌ 搜索请求失败: {response.text}")
-    
-    # 搜索 "admin"
-    print("\n🔎 搜索 'admin':")
-    response = requests.get(f"{BASE_URL}/admin/users?search=admin&page=1&page_size=10", headers=headers)
-    if response.status_code == 200:
-        data = response.json()
-        print(f"  - 搜索结果数: {len(data['items'])}")
-        print(f"  - 总匹配数: {data['total_count']}")
+        log.info("\n📄 测试第%s页:", page)
+    if data is not None:
+        derived = "（本地推算）" if local else ""
+        log.info("  - 第%s页用户数: %s", page, len(data['items']))
+        log.info("  - 有上一页%s: %s", derived, data['has_previous'])
+        log.info("  - 有下一页%s: %s", derived, data['has_next'])
+    else:
+        log.error("  ❌ 第%s页请求失败: %s", page, error)
+
+def print_search(term, response):
+    """打印搜索结果"""
+    log.info("\n🔎 搜索 '%s':", term)
+    if 200 <= response.status_code < 300:
+        data = orjson.loads(response.content)
+        log.info("  - 搜索结果数: %s", len(data['items']))
+        log.info("  - 总匹配数: %s", data['total_count'])
         for user in data['items']:
-            print(f"    - {user['username']}")
+            log.info("    - %s", user['username'])
     else:
-        print(f"❌ 搜索请求失败: {response.text}")
+        log.error("❌ 搜索请求失败: %s", short_body(response))
 
 def main():
-    print("🧪 开始测试用户管理分页功能")
-    
-    # 登录管理员
-    token = login_admin()
-    if not token:
-        return
-    
-    # 测试分页
-    test_pagination(token)
+    parser = argparse.ArgumentParser(description="测试用户管理分页功能")
+    parser.add_argument(
+        "--strict-pagination",
+        action="store_true",
+        help="逐页请求第2、3页以验证服务端分页字段（默认一次拉取后在本地切页）",
+    )
+    args = parser.parse_args()
     
-    # 测试搜索
-    test_search(token)
+    log.info("🧪 开始测试用户管理分页功能")
     
-    print("\n✅ 测试完成")
+    session = create_session()
+    try:
+        # 登录管理员，与 pytest fixture 共用同一次缓存的登录
+        try:
+            token = fetch_admin_token()
+        except httpx.HTTPError as e:
+            log.error("❌ 管理员登录失败: %s", e)
+            return
+        log.info("✅ 管理员登录成功")
+        session.headers["Authorization"] = f"Bearer {token}"
+        
+        # 测试分页：第1页决定还需要验证哪些页
+        follow_pages, total_pages = check_first_page(session)
+        
+        # 默认用一次请求拉回第2、3页覆盖的所有用户；严格模式逐页请求
+        if args.strict_pagination:
+            page_urls = [users_url(page) for page in follow_pages]
+        elif follow_pages:
+            page_urls = [users_url(1, page_size=PAGE_SIZE * max(follow_pages))]
+        else:
+            page_urls = []
+        
+        # 后续分页和搜索互不依赖，并发请求后按原顺序输出
+        search_urls = {term: users_url(1, page_size=10, search=term) for term in SEARCH_TERMS}
+        responses = fetch_concurrently(session, [*page_urls, *search_urls.values()])
+        
+        if args.strict_pagination:
+            for page, url in zip(follow_pages, page_urls, strict=True):
+                response = responses[url]
+                if 200 <= response.status_code < 300:
+                    print_page(page, orjson.loads(response.content))
+                else:
+                    print_page(page, error=short_body(response))
+        elif page_urls:
+            response = responses[page_urls[0]]
+            if 200 <= response.status_code < 300:
+                items = orjson.loads(response.content)['items']
+                for page in follow_pages:
+                    print_page(page, page_from_batch(items, page, total_pages), local=True)
+            else:
+                for page in follow_pages:
+                    print_page(page, error=short_body(response))
+        
+        # 测试搜索
+        log.info("\n🔍 测试搜索功能...")
+        for term, url in search_urls.items():
+            print_search(term, responses[url])
+        
+        log.info("\n✅ 测试完成")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
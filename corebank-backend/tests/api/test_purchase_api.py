@@ -4,10 +4,12 @@
 """
 
 import asyncio
-import aiohttp
-import json
+import logging
 from decimal import Decimal
 
+import aiohttp
+import orjson
+
 # 配置
 BASE_URL = "http://localhost:8000/api/v1"
 TEST_USER = {
@@ -15,6 +17,8 @@ TEST_USER = {
     "password": "TestPass123!"
 }
 
+log = logging.getLogger(__name__)
+
 async def login(session):
     """登录并获取访问令牌"""
     login_url = f"{BASE_URL}/auth/login"
@@ -24,168 +28,177 @@ async def login(session):
     }
     
     async with session.post(login_url, json=login_data) as response:
-        if response.status == 200:
-            result = await response.json()
+        body = await response.read()
+        if 200 <= response.status < 300:
+            result = orjson.loads(body)
             return result.get("access_token")
         else:
-            error = await response.text()
-            print(f"登录失败: {response.status} - {error}")
+            log.error("登录失败: %s - %s", response.status, body.decode(errors='replace'))
             return None
 
-async def get_user_accounts(session, token):
+async def get_user_accounts(session):
     """获取用户账户"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    async with session.get(f"{BASE_URL}/accounts", headers=headers) as response:
-        if response.status == 200:
-            return await response.json()
+    async with session.get(f"{BASE_URL}/accounts") as response:
+        body = await response.read()
+        if 200 <= response.status < 300:
+            return orjson.loads(body)
         else:
-            error = await response.text()
-            print(f"获取账户失败: {response.status} - {error}")
+            log.error("获取账户失败: %s - %s", response.status, body.decode(errors='replace'))
             return []
 
-async def get_investment_products(session, token):
+async def get_investment_products(session):
     """获取投资产品"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    async with session.get(f"{BASE_URL}/investments/products", headers=headers) as response:
-        if response.status == 200:
-            return await response.json()
+    async with session.get(f"{BASE_URL}/investments/products") as response:
+        body = await response.read()
+        if 200 <= response.status < 300:
+            return orjson.loads(body)
         else:
-            error = await response.text()
-            print(f"获取产品失败: {response.status} - {error}")
+            log.error("获取产品失败: %s - %s", response.status, body.decode(errors='replace'))
             return []
 
-async def purchase_investment(session, token, purchase_data):
+async def purchase_investment(session, purchase_data):
     """购买投资产品"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    async with session.post(f"{BASE_URL}/investments/purchase", json=purchase_data, headers=headers) as response:
-        result = await response.text()
-        if response.status == 200:
-            return json.loads(result)
+    async with session.post(f"{BASE_URL}/investments/purchase", json=purchase_data) as response:
+        body = await response.read()
+        if 200 <= response.status < 300:
+            return orjson.loads(body)
         else:
-            print(f"购买失败: {response.status} - {result}")
+            log.error("购买失败: %s - %s", response.status, body.decode(errors='replace'))
             return None
 
-async def get_investment_holdings(session, token):
+async def get_investment_holdings(session):
     """获取投资持仓"""
-    headers = {"Authorization": f"Bearer {token}"}
-    
-    async with session.get(f"{BASE_URL}/investments/holdings", headers=headers) as response:
-        if response.status == 200:
-            return await response.json()
+    async with session.get(f"{BASE_URL}/investments/holdings") as response:
+        body = await response.read()
+        if 200 <= response.status < 300:
+            return orjson.loads(body)
         else:
-            error = await response.text()
-            print(f"获取持仓失败: {response.status} - {error}")
+            log.error("获取持仓失败: %s - %s", response.status, body.decode(errors='replace'))
             return []
 
 async def main():
     """主测试函数"""
-    print("🚀 开始测试理财产品购买功能")
-    print("=" * 50)
+    log.info("🚀 开始测试理财产品购买功能")
+    log.info("=" * 50)
     
-    async with aiohttp.ClientSession() as session:
+    # 整个测试复用同一个连接池，保持与后端的长连接
+    connector = aiohttp.TCPConnector(limit=32, limit_per_host=16, keepalive_timeout=75, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    ) as session:
         # 1. 登录
-        print("1. 正在登录...")
+        log.info("1. 正在登录...")
         token = await login(session)
         if not token:
-            print("❌ 登录失败，测试终止")
+            log.error("❌ 登录失败，测试终止")
             return
-        print("✅ 登录成功")
+        log.info("✅ 登录成功")
+        # 认证头只在会话上设置一次，之后的请求自动携带
+        session.headers["Authorization"] = f"Bearer {token}"
         
         # 2. 获取用户账户
-        print("\n2. 获取用户账户...")
-        accounts = await get_user_accounts(session, token)
+        log.info("\n2. 获取用户账户...")
+        accounts = await get_user_accounts(session)
         if not accounts:
-            print("❌ 没有可用账户，测试终止")
+            log.error("❌ 没有可用账户，测试终止")
             return
         
         account = accounts[0]
-        print(f"✅ 找到账户: {account['account_number']}")
-        print(f"   账户类型: {account['account_type']}")
-        print(f"   账户余额: ¥{float(account['balance']):,.2f}")
+        # 金额字段按Decimal解析一次，后续计算和格式化都不经过float
+        original_balance = Decimal(account['balance'])
+        log.info("✅ 找到账户: %s", account['account_number'])
+        log.info("   账户类型: %s", account['account_type'])
+        log.info("   账户余额: ¥%s", format(original_balance, ",.2f"))
         
         # 3. 获取投资产品
-        print("\n3. 获取投资产品...")
-        products = await get_investment_products(session, token)
+        log.info("\n3. 获取投资产品...")
+        products = await get_investment_products(session)
         if not products:
-            print("❌ 没有可用产品，测试终止")
+            log.error("❌ 没有可用产品，测试终止")
             return
         
         # 选择第一个产品进行测试
         product = products[0]
-        print(f"✅ 选择产品: {product['name']}")
-        print(f"   产品代码: {product['product_code']}")
-        print(f"   起投金额: ¥{float(product['min_investment_amount']):,.2f}")
-        print(f"   预期收益率: {float(product['expected_return_rate']) * 100:.2f}%")
+        min_investment_amount = Decimal(product['min_investment_amount'])
+        log.info("✅ 选择产品: %s", product['name'])
+        log.info("   产品代码: %s", product['product_code'])
+        log.info("   起投金额: ¥%s", format(min_investment_amount, ",.2f"))
+        log.info("   预期收益率: %s%%", format(Decimal(product['expected_return_rate']) * 100, ".2f"))
         
         # 4. 测试购买
-        print("\n4. 测试购买...")
+        log.info("\n4. 测试购买...")
         
         # 计算购买金额（使用起投金额的2倍）
-        purchase_amount = float(product['min_investment_amount']) * 2
+        purchase_amount = min_investment_amount * 2
         
-        if purchase_amount > float(account['balance']):
-            purchase_amount = float(product['min_investment_amount'])
+        if purchase_amount > original_balance:
+            purchase_amount = min_investment_amount
         
         purchase_data = {
             "account_id": account['id'],
             "product_id": product['id'],
-            "amount": purchase_amount
+            "amount": str(purchase_amount)
         }
         
-        print(f"   购买金额: ¥{purchase_amount:,.2f}")
-        print(f"   购买数据: {purchase_data}")
+        log.info("   购买金额: ¥%s", format(purchase_amount, ",.2f"))
+        log.info("   购买数据: %s", purchase_data)
         
-        transaction = await purchase_investment(session, token, purchase_data)
+        transaction = await purchase_investment(session, purchase_data)
         if transaction:
-            print("✅ 购买成功！")
-            print(f"   交易ID: {transaction['id']}")
-            print(f"   交易类型: {transaction['transaction_type']}")
-            print(f"   购买份额: {float(transaction['shares']):.4f}")
-            print(f"   单位净值: ¥{float(transaction['unit_price']):.4f}")
-            print(f"   交易金额: ¥{float(transaction['amount']):,.2f}")
-            print(f"   手续费: ¥{float(transaction['fee']):,.2f}")
-            print(f"   净投资额: ¥{float(transaction['net_amount']):,.2f}")
+            # 交易明细拼成一段文本，一次输出
+            log.info(
+                "✅ 购买成功！\n"
+                f"   交易ID: {transaction['id']}\n"
+                f"   交易类型: {transaction['transaction_type']}\n"
+                f"   购买份额: {Decimal(transaction['shares']):.4f}\n"
+                f"   单位净值: ¥{Decimal(transaction['unit_price']):.4f}\n"
+                f"   交易金额: ¥{Decimal(transaction['amount']):,.2f}\n"
+                f"   手续费: ¥{Decimal(transaction['fee']):,.2f}\n"
+                f"   净投资额: ¥{Decimal(transaction['net_amount']):,.2f}"
+            )
         else:
-            print("❌ 购买失败")
+            log.error("❌ 购买失败")
             return
         
+        # 持仓和账户余额都只读取购买后的状态，互不依赖，并发请求
+        holdings, updated_accounts = await asyncio.gather(
+            get_investment_holdings(session),
+            get_user_accounts(session),
+        )
+        
         # 5. 验证持仓
-        print("\n5. 验证持仓...")
-        holdings = await get_investment_holdings(session, token)
+        log.info("\n5. 验证持仓...")
         if holdings:
-            print(f"✅ 持仓创建成功，共 {len(holdings)} 个持仓")
+            log.info("✅ 持仓创建成功，共 %s 个持仓", len(holdings))
             for holding in holdings:
-                print(f"   产品: {holding['product_name']}")
-                print(f"   持有份额: {float(holding['shares']):.4f}")
-                print(f"   总投资额: ¥{float(holding['total_invested']):,.2f}")
-                print(f"   当前价值: ¥{float(holding['current_value']):,.2f}")
+                log.info("   产品: %s", holding['product_name'])
+                log.info("   持有份额: %s", format(Decimal(holding['shares']), ".4f"))
+                log.info("   总投资额: ¥%s", format(Decimal(holding['total_invested']), ",.2f"))
+                log.info("   当前价值: ¥%s", format(Decimal(holding['current_value']), ",.2f"))
         else:
-            print("❌ 持仓验证失败")
+            log.error("❌ 持仓验证失败")
         
         # 6. 再次获取账户余额验证扣款
-        print("\n6. 验证账户余额...")
-        updated_accounts = await get_user_accounts(session, token)
+        log.info("\n6. 验证账户余额...")
         if updated_accounts:
             updated_account = updated_accounts[0]
-            original_balance = float(account['balance'])
-            new_balance = float(updated_account['balance'])
+            new_balance = Decimal(updated_account['balance'])
             deducted = original_balance - new_balance
             
-            print(f"✅ 账户余额更新")
-            print(f"   原余额: ¥{original_balance:,.2f}")
-            print(f"   新余额: ¥{new_balance:,.2f}")
-            print(f"   扣除金额: ¥{deducted:,.2f}")
+            log.info("✅ 账户余额更新")
+            log.info("   原余额: ¥%s", format(original_balance, ",.2f"))
+            log.info("   新余额: ¥%s", format(new_balance, ",.2f"))
+            log.info("   扣除金额: ¥%s", format(deducted, ",.2f"))
             
-            if abs(deducted - purchase_amount) < 0.01:
-                print("✅ 扣款金额正确")
+            if abs(deducted - purchase_amount) < Decimal("0.01"):
+                log.info("✅ 扣款金额正确")
             else:
-                print(f"❌ 扣款金额不正确，预期: ¥{purchase_amount:,.2f}")
+                log.error("❌ 扣款金额不正确，预期: ¥%s", format(purchase_amount, ",.2f"))
         
-    print("\n" + "=" * 50)
-    print("🎉 测试完成！")
+    log.info("\n" + "=" * 50)
+    log.info("🎉 测试完成！")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     asyncio.run(main())
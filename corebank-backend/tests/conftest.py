@@ -0,0 +1,39 @@
+"""
+Shared pytest fixtures for CoreBank tests.
+
+The API scripts under tests/api and tests/integration talk to a running
+backend. The admin token is fetched once per test session and shared by every
+test that needs it.
+"""
+
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from tests.helpers import API_BASE_URL, fetch_admin_token
+
+
+@pytest.fixture(scope="session")
+def admin_token() -> str:
+    """Log in as admin once per session and return the access token."""
+    try:
+        return fetch_admin_token()
+    except httpx.ConnectError:
+        pytest.skip(f"CoreBank API is not reachable at {API_BASE_URL}")
+
+
+@pytest.fixture
+async def admin_client(admin_token: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Async client pre-authorized with the session admin token.
+
+    The client stays function-scoped: pytest-asyncio runs every test on its
+    own event loop, and httpx's pooled connections are bound to the loop that
+    opened them, so a session-wide client would hand later tests connections
+    from a closed loop. The expensive part, the login, is shared above.
+    """
+    async with httpx.AsyncClient(
+        base_url=API_BASE_URL,
+        headers={"Authorization": f"Bearer {admin_token}"},
+    ) as client:
+        yield client
@@ -0,0 +1,52 @@
+"""
+Shared helpers for the CoreBank API test scripts.
+
+The scripts under tests/api and tests/integration import this module as
+``tests.helpers``, so run them from corebank-backend either through pytest or
+as modules, e.g. ``python -m tests.api.test_admin_api``.
+"""
+
+from functools import cache
+
+import httpx
+
+API_BASE_URL = "http://localhost:8000/api/v1"
+ADMIN_CREDENTIALS = {"username": "admin", "password": "admin123"}
+
+
+@cache
+def fetch_admin_token() -> str:
+    """Log in as admin once per process and return the access token.
+
+    Logging in costs a bcrypt verification on the server, so the pytest
+    fixtures and the scripts' own main() share this single cached login.
+    """
+    response = httpx.post(f"{API_BASE_URL}/auth/login", json=ADMIN_CREDENTIALS)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def short_body(response) -> str:
+    """First 256 bytes of an error body, decoded without charset detection."""
+    return response.content[:256].decode("utf-8", "replace")
+
+
+def create_session():
+    """requests.Session with a connection pool and retries, reused for a whole run.
+
+    Only the synchronous scripts use requests, so it is imported here rather
+    than at module level.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
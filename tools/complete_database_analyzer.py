@@ -2,73 +2,192 @@
 """
 CoreBank 数据库结构完整提取工具
 提取数据库的完整结构信息，包括表、列、索引、约束、关系等
+
+连接参数读取与后端相同的环境变量：POSTGRES_HOST、POSTGRES_PORT、
+POSTGRES_USER、POSTGRES_PASSWORD、POSTGRES_DB。
 """
 
-import subprocess
+import argparse
 import json
 import sys
 import os
+from collections import defaultdict
+from contextlib import nullcontext
+from operator import itemgetter
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+
+try:
+    import orjson  # 可选依赖：C实现的JSON序列化，直接输出UTF-8字节，结构文件较大时明显更快
+except ImportError:
+    orjson = None
+
+# 以下目录查询一次覆盖 public 模式下的所有表，结果在客户端按表名分组
+# 列别名即输出结构的字段名，除 table_name 外的每行可直接放入结构
+COLUMNS_QUERY = """
+SELECT 
+    table_name,
+    column_name AS name,
+    data_type,
+    is_nullable = 'YES' AS nullable,
+    column_default AS "default",
+    character_maximum_length AS max_length,
+    numeric_precision AS precision,
+    numeric_scale AS scale,
+    ordinal_position AS position
+FROM information_schema.columns 
+WHERE table_schema = 'public'
+ORDER BY table_name, ordinal_position;
+"""
+
+# 约束和外键共用一次扫描，结果在客户端拆分。约束名只在单表内唯一，因此列按
+# (模式, 表名, 约束名) 匹配；外键的本表列与被引用列取自 pg_constraint 的
+# conkey/confkey，按同一序号一一配对，复合外键因此每列只产生一行
+CONSTRAINTS_QUERY = """
+SELECT 
+    tc.table_name,
+    tc.constraint_name AS name,
+    tc.constraint_type AS type,
+    kcu.column_name AS "column",
+    fk.referenced_table,
+    fk.referenced_column
+FROM information_schema.table_constraints tc
+LEFT JOIN information_schema.key_column_usage kcu
+    ON kcu.constraint_schema = tc.constraint_schema
+    AND kcu.constraint_name = tc.constraint_name
+    AND kcu.table_schema = tc.table_schema
+    AND kcu.table_name = tc.table_name
+LEFT JOIN (
+    SELECT 
+        c.relname AS table_name,
+        con.conname AS name,
+        k.position,
+        rc.relname AS referenced_table,
+        ra.attname AS referenced_column
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey)
+        WITH ORDINALITY AS k(attnum, refattnum, position)
+    JOIN pg_class rc ON rc.oid = con.confrelid
+    JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.refattnum
+    WHERE con.contype = 'f' AND n.nspname = 'public'
+) fk
+    ON tc.constraint_type = 'FOREIGN KEY'
+    AND fk.table_name = tc.table_name
+    AND fk.name = tc.constraint_name
+    AND fk.position = kcu.ordinal_position
+WHERE tc.table_schema = 'public'
+ORDER BY tc.table_name, tc.constraint_type, tc.constraint_name, kcu.ordinal_position;
+"""
+
+INDEXES_QUERY = """
+SELECT 
+    tablename AS table_name,
+    indexname AS name,
+    indexdef AS definition
+FROM pg_indexes 
+WHERE schemaname = 'public'
+ORDER BY tablename, indexname;
+"""
+
+# 行数取自统计信息收集器的估算值，避免对每个表做全表扫描
+ROW_COUNTS_QUERY = """
+SELECT 
+    relname AS table_name,
+    n_live_tup AS row_count
+FROM pg_stat_user_tables
+WHERE schemaname = 'public';
+"""
+
+# --exact 时逐表使用：每个表都会被全表扫描。表名经 sql.Identifier 引用，
+# 不依赖 query_to_xml，因此在未编译 libxml 的服务器上同样可用
+EXACT_ROW_COUNT_QUERY = sql.SQL("SELECT COUNT(*) AS row_count FROM {}.{}")
+
+TABLE_SIZES_QUERY = """
+SELECT 
+    c.relname AS table_name,
+    pg_size_pretty(pg_total_relation_size(c.oid)) AS size
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p');
+"""
+
+# 报告中逐行重复的Markdown模板，直接用目录行字典填充
+STAT_ROW = "| {table_name} | {row_count} | {size} |\n"
+RELATIONSHIP_ROW = "- {from_table}.{from_column} → {to_table}.{to_column}\n"
+COLUMN_ROW = "| {name} | {data_type} | {nullable} | {default} |\n"
+INDEX_ROW = "- **{name}**\n"
+FOREIGN_KEY_ROW = "- **{column}** → {referenced_table}.{referenced_column}\n"
+
+def _group_by_table(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """按 table_name 分组，组内每行去掉 table_name 后即为输出结构"""
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.pop("table_name")].append(row)
+    return grouped
+
 class DatabaseStructureAnalyzer:
     """数据库结构分析器"""
     
-    def __init__(self, container_name="corebank_postgres", db_user="corebank_user", db_name="corebank"):
-        self.container_name = container_name
-        self.db_user = db_user
-        self.db_name = db_name
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 db_user: Optional[str] = None, db_password: Optional[str] = None,
+                 db_name: Optional[str] = None, exact_counts: bool = False):
+        self.host = host or os.environ.get("POSTGRES_HOST", "localhost")
+        self.port = port or int(os.environ.get("POSTGRES_PORT", "5432"))
+        self.db_user = db_user or os.environ.get("POSTGRES_USER", "corebank_user")
+        self.db_name = db_name or os.environ.get("POSTGRES_DB", "corebank")
+        self.exact_counts = exact_counts
         self.structure_data = {}
-    
-    def execute_sql(self, query: str) -> str:
-        """执行SQL查询并返回结果"""
-        cmd = [
-            "podman", "exec", self.container_name,
-            "psql", "-U", self.db_user, "-d", self.db_name,
-            "-c", query
-        ]
         
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            print(f"❌ SQL执行错误: {e}")
-            return ""
+        # 整个分析过程复用同一个连接，单独的查询使用自动提交；
+        # 行以字典返回，值已是数据库原生类型，无需再做文本转换
+        self.conn = psycopg.connect(
+            host=self.host,
+            port=self.port,
+            user=self.db_user,
+            password=db_password or os.environ.get("POSTGRES_PASSWORD"),
+            dbname=self.db_name,
+            autocommit=True,
+            row_factory=dict_row,
+        )
+        # 完整分析时显式开启的事务使用同一快照且只读，保证各目录查询结果相互一致
+        self.conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        self.conn.read_only = True
+    
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self.conn.close()
+    
+    def _fetch(self, query, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """执行查询并返回所有行"""
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
     
     def get_database_info(self) -> Dict[str, Any]:
         """获取数据库基本信息"""
         print("📊 获取数据库基本信息...")
         
-        # 数据库版本
-        version_result = self.execute_sql("SELECT version();")
-        
-        # 数据库大小
-        size_result = self.execute_sql(f"SELECT pg_size_pretty(pg_database_size('{self.db_name}'));")
-        
-        # 表数量
-        table_count = self.execute_sql("""
-        SELECT COUNT(*) 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public' AND table_type = 'BASE TABLE';
-        """)
+        info = self._fetch("""
+        SELECT
+            version() AS version,
+            pg_size_pretty(pg_database_size(current_database())) AS size,
+            (SELECT COUNT(*)
+             FROM information_schema.tables
+             WHERE table_schema = 'public' AND table_type = 'BASE TABLE') AS table_count;
+        """)[0]
         
         return {
             "database_name": self.db_name,
-            "version": self._extract_value(version_result),
-            "size": self._extract_value(size_result),
-            "table_count": self._extract_value(table_count),
+            **info,
             "analysis_time": datetime.now().isoformat()
         }
     
-    def _extract_value(self, result: str) -> str:
-        """从查询结果中提取值"""
-        lines = result.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('-') and not line.startswith('(') and not 'row' in line and not line.startswith('version') and not line.startswith('pg_size_pretty') and not line.startswith('count'):
-                return line
-        return ""
-    
     def get_all_tables(self) -> List[str]:
         """获取所有表名"""
         print("📋 获取所有表名...")
@@ -81,16 +200,7 @@ class DatabaseStructureAnalyzer:
         ORDER BY table_name;
         """
         
-        result = self.execute_sql(query)
-        tables = []
-        
-        for line in result.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('-') and not line.startswith('table_name') and not line.endswith('rows)'):
-                if line and not line.startswith('('):
-                    tables.append(line)
-        
-        return tables
+        return [row["table_name"] for row in self._fetch(query)]
     
     def get_table_structure(self, table_name: str) -> Dict[str, Any]:
         """获取表的完整结构信息"""
@@ -108,234 +218,125 @@ class DatabaseStructureAnalyzer:
         
         return structure
     
-    def get_table_columns(self, table_name: str) -> List[Dict[str, Any]]:
-        """获取表列信息"""
-        query = f"""
-        SELECT 
-            column_name,
-            data_type,
-            is_nullable,
-            column_default,
-            character_maximum_length,
-            numeric_precision,
-            numeric_scale,
-            ordinal_position
-        FROM information_schema.columns 
-        WHERE table_name = '{table_name}' 
-        ORDER BY ordinal_position;
-        """
+    def _catalog(self) -> Dict[str, Any]:
+        """按表名分组的目录信息，首次访问时批量加载"""
+        if not self.structure_data:
+            self.structure_data = self._load_catalog()
+        return self.structure_data
+    
+    def _load_catalog(self) -> Dict[str, Any]:
+        """用少量批量查询取回所有表的列、约束、索引、外键、行数和大小"""
+        queries = (COLUMNS_QUERY, CONSTRAINTS_QUERY, INDEXES_QUERY,
+                   ROW_COUNTS_QUERY, TABLE_SIZES_QUERY)
         
-        result = self.execute_sql(query)
-        columns = []
+        # 管道模式下所有查询连续发出，只等待一次往返（需要 libpq >= 14，否则逐条执行）
+        pipeline = self.conn.pipeline() if psycopg.Pipeline.is_supported() else nullcontext()
+        with pipeline:
+            cursors = [self.conn.execute(query) for query in queries]
+        (column_rows, constraint_rows, index_rows,
+         row_count_rows, size_rows) = (cur.fetchall() for cur in cursors)
         
-        lines = result.split('\n')
-        data_started = False
+        # 所有约束按表分组；外键约束另外按 (表名, 列名) 排序后生成外键和全局外键关系
+        constraints = defaultdict(list)
+        foreign_key_rows = []
+        for row in constraint_rows:
+            constraints[row["table_name"]].append(
+                {"name": row["name"], "type": row["type"], "column": row["column"]}
+            )
+            if row["type"] == "FOREIGN KEY":
+                foreign_key_rows.append(row)
+        foreign_key_rows.sort(key=itemgetter("table_name", "column"))
         
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 8:
-                    columns.append({
-                        "name": parts[0],
-                        "data_type": parts[1],
-                        "nullable": parts[2] == "YES",
-                        "default": parts[3] if parts[3] and parts[3] != '' else None,
-                        "max_length": parts[4] if parts[4] and parts[4] != '' else None,
-                        "precision": parts[5] if parts[5] and parts[5] != '' else None,
-                        "scale": parts[6] if parts[6] and parts[6] != '' else None,
-                        "position": int(parts[7]) if parts[7].isdigit() else 0
-                    })
-            elif line.startswith('column_name'):
-                data_started = True
+        foreign_keys = defaultdict(list)
+        relationships = []
+        for row in foreign_key_rows:
+            foreign_keys[row["table_name"]].append({
+                "constraint_name": row["name"],
+                "column": row["column"],
+                "referenced_table": row["referenced_table"],
+                "referenced_column": row["referenced_column"]
+            })
+            relationships.append({
+                "from_table": row["table_name"],
+                "from_column": row["column"],
+                "to_table": row["referenced_table"],
+                "to_column": row["referenced_column"],
+                "constraint_name": row["name"]
+            })
         
-        return columns
+        return {
+            "columns": _group_by_table(column_rows),
+            "constraints": constraints,
+            "indexes": _group_by_table(index_rows),
+            "foreign_keys": foreign_keys,
+            "relationships": relationships,
+            "row_counts": (
+                self._exact_row_counts([row["table_name"] for row in size_rows])
+                if self.exact_counts
+                else {row["table_name"]: row["row_count"] for row in row_count_rows}
+            ),
+            "sizes": {row["table_name"]: row["size"] for row in size_rows},
+        }
+    
+    def _exact_row_counts(self, tables: List[str]) -> Dict[str, int]:
+        """逐表执行 COUNT(*) 取精确行数，查询同样经管道连续发出"""
+        pipeline = self.conn.pipeline() if psycopg.Pipeline.is_supported() else nullcontext()
+        with pipeline:
+            cursors = {
+                table: self.conn.execute(
+                    EXACT_ROW_COUNT_QUERY.format(sql.Identifier("public"), sql.Identifier(table))
+                )
+                for table in tables
+            }
+        return {table: cur.fetchone()["row_count"] for table, cur in cursors.items()}
+    
+    def get_table_columns(self, table_name: str) -> List[Dict[str, Any]]:
+        """获取表列信息"""
+        return self._catalog()["columns"].get(table_name, [])
     
     def get_table_constraints(self, table_name: str) -> List[Dict[str, Any]]:
         """获取表约束信息"""
-        query = f"""
-        SELECT 
-            tc.constraint_name,
-            tc.constraint_type,
-            kcu.column_name
-        FROM information_schema.table_constraints tc
-        LEFT JOIN information_schema.key_column_usage kcu
-            ON tc.constraint_name = kcu.constraint_name
-        WHERE tc.table_name = '{table_name}'
-        ORDER BY tc.constraint_type, tc.constraint_name;
-        """
-        
-        result = self.execute_sql(query)
-        constraints = []
-        
-        lines = result.split('\n')
-        data_started = False
-        
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 3:
-                    constraints.append({
-                        "name": parts[0],
-                        "type": parts[1],
-                        "column": parts[2] if parts[2] and parts[2] != '' else None
-                    })
-            elif 'constraint_name' in line:
-                data_started = True
-        
-        return constraints
+        return self._catalog()["constraints"].get(table_name, [])
     
     def get_table_indexes(self, table_name: str) -> List[Dict[str, Any]]:
         """获取表索引信息"""
-        query = f"""
-        SELECT 
-            indexname,
-            indexdef
-        FROM pg_indexes 
-        WHERE tablename = '{table_name}'
-        ORDER BY indexname;
-        """
-        
-        result = self.execute_sql(query)
-        indexes = []
-        
-        lines = result.split('\n')
-        data_started = False
-        
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 2:
-                    indexes.append({
-                        "name": parts[0],
-                        "definition": parts[1]
-                    })
-            elif 'indexname' in line:
-                data_started = True
-        
-        return indexes
+        return self._catalog()["indexes"].get(table_name, [])
     
     def get_table_foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
         """获取表外键信息"""
-        query = f"""
-        SELECT 
-            tc.constraint_name,
-            kcu.column_name,
-            ccu.table_name AS foreign_table_name,
-            ccu.column_name AS foreign_column_name
-        FROM information_schema.table_constraints AS tc
-        JOIN information_schema.key_column_usage AS kcu
-            ON tc.constraint_name = kcu.constraint_name
-        JOIN information_schema.constraint_column_usage AS ccu
-            ON ccu.constraint_name = tc.constraint_name
-        WHERE tc.constraint_type = 'FOREIGN KEY' 
-        AND tc.table_name = '{table_name}'
-        ORDER BY kcu.column_name;
-        """
-        
-        result = self.execute_sql(query)
-        foreign_keys = []
-        
-        lines = result.split('\n')
-        data_started = False
-        
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 4:
-                    foreign_keys.append({
-                        "constraint_name": parts[0],
-                        "column": parts[1],
-                        "referenced_table": parts[2],
-                        "referenced_column": parts[3]
-                    })
-            elif 'constraint_name' in line:
-                data_started = True
-        
-        return foreign_keys
+        return self._catalog()["foreign_keys"].get(table_name, [])
     
     def get_table_row_count(self, table_name: str) -> int:
-        """获取表行数"""
-        query = f"SELECT COUNT(*) FROM {table_name};"
-        result = self.execute_sql(query)
-        
-        for line in result.split('\n'):
-            line = line.strip()
-            if line.isdigit():
-                return int(line)
-        
-        return 0
+        """获取表行数（默认为 pg_stat_user_tables 的估算值，exact_counts 时为精确值）"""
+        return self._catalog()["row_counts"].get(table_name, 0)
     
     def get_table_size(self, table_name: str) -> str:
         """获取表大小"""
-        query = f"SELECT pg_size_pretty(pg_total_relation_size('{table_name}'));"
-        result = self.execute_sql(query)
-        return self._extract_value(result)
+        return self._catalog()["sizes"].get(table_name, "")
 
     def get_all_foreign_key_relationships(self) -> List[Dict[str, Any]]:
         """获取所有外键关系"""
         print("🔗 分析外键关系...")
 
-        query = """
-        SELECT
-            tc.table_name,
-            kcu.column_name,
-            ccu.table_name AS foreign_table_name,
-            ccu.column_name AS foreign_column_name,
-            tc.constraint_name
-        FROM information_schema.table_constraints AS tc
-        JOIN information_schema.key_column_usage AS kcu
-            ON tc.constraint_name = kcu.constraint_name
-        JOIN information_schema.constraint_column_usage AS ccu
-            ON ccu.constraint_name = tc.constraint_name
-        WHERE tc.constraint_type = 'FOREIGN KEY'
-        ORDER BY tc.table_name, kcu.column_name;
-        """
+        return self._catalog()["relationships"]
 
-        result = self.execute_sql(query)
-        relationships = []
+    def get_database_statistics(self, tables: List[str]) -> Dict[str, Any]:
+        """获取数据库统计信息
 
-        lines = result.split('\n')
-        data_started = False
-
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 5:
-                    relationships.append({
-                        "from_table": parts[0],
-                        "from_column": parts[1],
-                        "to_table": parts[2],
-                        "to_column": parts[3],
-                        "constraint_name": parts[4]
-                    })
-            elif 'table_name' in line:
-                data_started = True
-
-        return relationships
-
-    def get_database_statistics(self) -> Dict[str, Any]:
-        """获取数据库统计信息"""
+        Args:
+            tables: 已获取的表名列表，行数和大小取自已加载的目录缓存
+        """
         print("📈 获取数据库统计信息...")
 
-        tables = self.get_all_tables()
-        total_rows = 0
-        table_stats = []
-
-        for table in tables:
-            row_count = self.get_table_row_count(table)
-            table_size = self.get_table_size(table)
-            total_rows += row_count
-
-            table_stats.append({
+        table_stats = [
+            {
                 "table_name": table,
-                "row_count": row_count,
-                "size": table_size
-            })
+                "row_count": self.get_table_row_count(table),
+                "size": self.get_table_size(table)
+            }
+            for table in tables
+        ]
+        total_rows = sum(stat["row_count"] for stat in table_stats)
 
         return {
             "total_tables": len(tables),
@@ -348,27 +349,29 @@ class DatabaseStructureAnalyzer:
         print("🚀 开始完整数据库结构分析...")
         print("=" * 60)
 
-        # 获取基本信息
-        db_info = self.get_database_info()
-        print(f"数据库: {db_info['database_name']}")
-        print(f"版本: {db_info['version']}")
-        print(f"大小: {db_info['size']}")
+        # 所有查询在同一个 REPEATABLE READ 只读事务中执行，看到的是同一份快照
+        with self.conn.transaction():
+            # 获取基本信息
+            db_info = self.get_database_info()
+            print(f"数据库: {db_info['database_name']}")
+            print(f"版本: {db_info['version']}")
+            print(f"大小: {db_info['size']}")
 
-        # 获取所有表
-        tables = self.get_all_tables()
-        print(f"表数量: {len(tables)}")
+            # 获取所有表
+            tables = self.get_all_tables()
+            print(f"表数量: {len(tables)}")
 
-        # 分析每个表
-        table_structures = []
-        for table in tables:
-            structure = self.get_table_structure(table)
-            table_structures.append(structure)
+            # 分析每个表
+            table_structures = []
+            for table in tables:
+                structure = self.get_table_structure(table)
+                table_structures.append(structure)
 
-        # 获取外键关系
-        foreign_key_relationships = self.get_all_foreign_key_relationships()
+            # 获取外键关系
+            foreign_key_relationships = self.get_all_foreign_key_relationships()
 
-        # 获取统计信息
-        statistics = self.get_database_statistics()
+            # 获取统计信息
+            statistics = self.get_database_statistics(tables)
 
         # 组装完整结构
         complete_structure = {
@@ -386,8 +389,12 @@ class DatabaseStructureAnalyzer:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"database_structure_{timestamp}.json"
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(structure, f, ensure_ascii=False, indent=2, default=str)
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(structure, option=orjson.OPT_INDENT_2, default=str))
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(structure, f, ensure_ascii=False, indent=2, default=str)
 
         print(f"✅ 数据库结构已保存到: {filename}")
         return filename
@@ -398,74 +405,80 @@ class DatabaseStructureAnalyzer:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"database_analysis_report_{timestamp}.md"
 
+        # 先在内存中拼好整份报告，最后一次性写入文件
+        parts: List[str] = []
+        w = parts.append
+
+        w("# CoreBank 数据库结构分析报告\n\n")
+
+        # 基本信息
+        db_info = structure['database_info']
+        w("## 📊 数据库基本信息\n\n")
+        w(f"- **数据库名**: {db_info['database_name']}\n")
+        w(f"- **版本**: {db_info['version']}\n")
+        w(f"- **大小**: {db_info['size']}\n")
+        w(f"- **表数量**: {db_info['table_count']}\n")
+        w(f"- **分析时间**: {db_info['analysis_time']}\n\n")
+
+        # 统计信息
+        stats = structure['statistics']
+        w("## 📈 数据统计\n\n")
+        w("| 表名 | 行数 | 大小 |\n")
+        w("|------|------|------|\n")
+        parts.extend(map(STAT_ROW.format_map, stats['table_statistics']))
+        w(f"\n**总计**: {stats['total_tables']} 个表，{stats['total_rows']} 行数据\n\n")
+
+        # 外键关系
+        w("## 🔗 外键关系\n\n")
+        parts.extend(map(RELATIONSHIP_ROW.format_map, structure['foreign_key_relationships']))
+        w("\n")
+
+        # 表结构详情
+        w("## 🏗️ 表结构详情\n\n")
+        for table in structure['tables']:
+            w(f"### {table['table_name']}\n\n")
+            w(f"**行数**: {table['row_count']} | **大小**: {table['table_size']}\n\n")
+
+            # 列信息
+            w("#### 列信息\n\n")
+            w("| 列名 | 数据类型 | 可空 | 默认值 |\n")
+            w("|------|----------|------|--------|\n")
+            parts.extend(
+                COLUMN_ROW.format_map({
+                    **col,
+                    'nullable': "是" if col['nullable'] else "否",
+                    'default': col['default'] if col['default'] else "-",
+                })
+                for col in table['columns']
+            )
+            w("\n")
+
+            # 约束信息
+            if table['constraints']:
+                w("#### 约束\n\n")
+                for constraint in table['constraints']:
+                    w(f"- **{constraint['name']}** ({constraint['type']})")
+                    if constraint['column']:
+                        w(f": {constraint['column']}")
+                    w("\n")
+                w("\n")
+
+            # 索引信息
+            if table['indexes']:
+                w("#### 索引\n\n")
+                parts.extend(map(INDEX_ROW.format_map, table['indexes']))
+                w("\n")
+
+            # 外键信息
+            if table['foreign_keys']:
+                w("#### 外键\n\n")
+                parts.extend(map(FOREIGN_KEY_ROW.format_map, table['foreign_keys']))
+                w("\n")
+
+            w("---\n\n")
+
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write("# CoreBank 数据库结构分析报告\n\n")
-
-            # 基本信息
-            db_info = structure['database_info']
-            f.write("## 📊 数据库基本信息\n\n")
-            f.write(f"- **数据库名**: {db_info['database_name']}\n")
-            f.write(f"- **版本**: {db_info['version']}\n")
-            f.write(f"- **大小**: {db_info['size']}\n")
-            f.write(f"- **表数量**: {db_info['table_count']}\n")
-            f.write(f"- **分析时间**: {db_info['analysis_time']}\n\n")
-
-            # 统计信息
-            stats = structure['statistics']
-            f.write("## 📈 数据统计\n\n")
-            f.write("| 表名 | 行数 | 大小 |\n")
-            f.write("|------|------|------|\n")
-            for table_stat in stats['table_statistics']:
-                f.write(f"| {table_stat['table_name']} | {table_stat['row_count']} | {table_stat['size']} |\n")
-            f.write(f"\n**总计**: {stats['total_tables']} 个表，{stats['total_rows']} 行数据\n\n")
-
-            # 外键关系
-            f.write("## 🔗 外键关系\n\n")
-            for rel in structure['foreign_key_relationships']:
-                f.write(f"- {rel['from_table']}.{rel['from_column']} → {rel['to_table']}.{rel['to_column']}\n")
-            f.write("\n")
-
-            # 表结构详情
-            f.write("## 🏗️ 表结构详情\n\n")
-            for table in structure['tables']:
-                f.write(f"### {table['table_name']}\n\n")
-                f.write(f"**行数**: {table['row_count']} | **大小**: {table['table_size']}\n\n")
-
-                # 列信息
-                f.write("#### 列信息\n\n")
-                f.write("| 列名 | 数据类型 | 可空 | 默认值 |\n")
-                f.write("|------|----------|------|--------|\n")
-                for col in table['columns']:
-                    nullable = "是" if col['nullable'] else "否"
-                    default = col['default'] if col['default'] else "-"
-                    f.write(f"| {col['name']} | {col['data_type']} | {nullable} | {default} |\n")
-                f.write("\n")
-
-                # 约束信息
-                if table['constraints']:
-                    f.write("#### 约束\n\n")
-                    for constraint in table['constraints']:
-                        f.write(f"- **{constraint['name']}** ({constraint['type']})")
-                        if constraint['column']:
-                            f.write(f": {constraint['column']}")
-                        f.write("\n")
-                    f.write("\n")
-
-                # 索引信息
-                if table['indexes']:
-                    f.write("#### 索引\n\n")
-                    for index in table['indexes']:
-                        f.write(f"- **{index['name']}**\n")
-                    f.write("\n")
-
-                # 外键信息
-                if table['foreign_keys']:
-                    f.write("#### 外键\n\n")
-                    for fk in table['foreign_keys']:
-                        f.write(f"- **{fk['column']}** → {fk['referenced_table']}.{fk['referenced_column']}\n")
-                    f.write("\n")
-
-                f.write("---\n\n")
+            f.write(''.join(parts))
 
         print(f"✅ 分析报告已保存到: {filename}")
         return filename
@@ -473,11 +486,23 @@ class DatabaseStructureAnalyzer:
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="CoreBank 数据库结构完整提取工具")
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="逐表执行 COUNT(*) 统计精确行数，会全表扫描每个表（默认使用统计信息中的估算值）",
+    )
+    args = parser.parse_args()
+
     print("🔍 CoreBank 数据库结构完整提取工具")
     print("=" * 50)
 
     # 创建分析器
-    analyzer = DatabaseStructureAnalyzer()
+    try:
+        analyzer = DatabaseStructureAnalyzer(exact_counts=args.exact)
+    except psycopg.OperationalError as e:
+        print(f"❌ 无法连接数据库: {e}")
+        sys.exit(1)
 
     try:
         # 执行完整分析
@@ -509,201 +534,9 @@ def main():
     except Exception as e:
         print(f"❌ 分析过程中出现错误: {e}")
         sys.exit(1)
+    finally:
+        analyzer.close()
 
 
 if __name__ == "__main__":
     main()
-
-    def get_all_foreign_key_relationships(self) -> List[Dict[str, Any]]:
-        """获取所有外键关系"""
-        print("🔗 分析外键关系...")
-
-        query = """
-        SELECT
-            tc.table_name,
-            kcu.column_name,
-            ccu.table_name AS foreign_table_name,
-            ccu.column_name AS foreign_column_name,
-            tc.constraint_name
-        FROM information_schema.table_constraints AS tc
-        JOIN information_schema.key_column_usage AS kcu
-            ON tc.constraint_name = kcu.constraint_name
-        JOIN information_schema.constraint_column_usage AS ccu
-            ON ccu.constraint_name = tc.constraint_name
-        WHERE tc.constraint_type = 'FOREIGN KEY'
-        ORDER BY tc.table_name, kcu.column_name;
-        """
-
-        result = self.execute_sql(query)
-        relationships = []
-
-        lines = result.split('\n')
-        data_started = False
-
-        for line in lines:
-            line = line.strip()
-            if '|' in line and data_started:
-                parts = [p.strip() for p in line.split('|')]
-                if len(parts) >= 5:
-                    relationships.append({
-                        "from_table": parts[0],
-                        "from_column": parts[1],
-                        "to_table": parts[2],
-                        "to_column": parts[3],
-                        "constraint_name": parts[4]
-                    })
-            elif 'table_name' in line:
-                data_started = True
-
-        return relationships
-
-    def get_database_statistics(self) -> Dict[str, Any]:
-        """获取数据库统计信息"""
-        print("📈 获取数据库统计信息...")
-
-        tables = self.get_all_tables()
-        total_rows = 0
-        table_stats = []
-
-        for table in tables:
-            row_count = self.get_table_row_count(table)
-            table_size = self.get_table_size(table)
-            total_rows += row_count
-
-            table_stats.append({
-                "table_name": table,
-                "row_count": row_count,
-                "size": table_size
-            })
-
-        return {
-            "total_tables": len(tables),
-            "total_rows": total_rows,
-            "table_statistics": table_stats
-        }
-
-    def analyze_complete_structure(self) -> Dict[str, Any]:
-        """完整分析数据库结构"""
-        print("🚀 开始完整数据库结构分析...")
-        print("=" * 60)
-
-        # 获取基本信息
-        db_info = self.get_database_info()
-        print(f"数据库: {db_info['database_name']}")
-        print(f"版本: {db_info['version']}")
-        print(f"大小: {db_info['size']}")
-
-        # 获取所有表
-        tables = self.get_all_tables()
-        print(f"表数量: {len(tables)}")
-
-        # 分析每个表
-        table_structures = []
-        for table in tables:
-            structure = self.get_table_structure(table)
-            table_structures.append(structure)
-
-        # 获取外键关系
-        foreign_key_relationships = self.get_all_foreign_key_relationships()
-
-        # 获取统计信息
-        statistics = self.get_database_statistics()
-
-        # 组装完整结构
-        complete_structure = {
-            "database_info": db_info,
-            "tables": table_structures,
-            "foreign_key_relationships": foreign_key_relationships,
-            "statistics": statistics
-        }
-
-        return complete_structure
-
-    def save_structure_to_file(self, structure: Dict[str, Any], filename: Optional[str] = None) -> str:
-        """保存结构到JSON文件"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"database_structure_{timestamp}.json"
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(structure, f, ensure_ascii=False, indent=2, default=str)
-
-        print(f"✅ 数据库结构已保存到: {filename}")
-        return filename
-
-    def generate_markdown_report(self, structure: Dict[str, Any], filename: Optional[str] = None) -> str:
-        """生成Markdown格式的分析报告"""
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"database_analysis_report_{timestamp}.md"
-
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("# CoreBank 数据库结构分析报告\n\n")
-
-            # 基本信息
-            db_info = structure['database_info']
-            f.write("## 📊 数据库基本信息\n\n")
-            f.write(f"- **数据库名**: {db_info['database_name']}\n")
-            f.write(f"- **版本**: {db_info['version']}\n")
-            f.write(f"- **大小**: {db_info['size']}\n")
-            f.write(f"- **表数量**: {db_info['table_count']}\n")
-            f.write(f"- **分析时间**: {db_info['analysis_time']}\n\n")
-
-            # 统计信息
-            stats = structure['statistics']
-            f.write("## 📈 数据统计\n\n")
-            f.write("| 表名 | 行数 | 大小 |\n")
-            f.write("|------|------|------|\n")
-            for table_stat in stats['table_statistics']:
-                f.write(f"| {table_stat['table_name']} | {table_stat['row_count']} | {table_stat['size']} |\n")
-            f.write(f"\n**总计**: {stats['total_tables']} 个表，{stats['total_rows']} 行数据\n\n")
-
-            # 表结构详情
-            f.write("## 🏗️ 表结构详情\n\n")
-            for table in structure['tables']:
-                f.write(f"### {table['table_name']}\n\n")
-
-                # 列信息
-                f.write("#### 列信息\n\n")
-                f.write("| 列名 | 数据类型 | 可空 | 默认值 | 说明 |\n")
-                f.write("|------|----------|------|--------|------|\n")
-                for col in table['columns']:
-                    nullable = "是" if col['nullable'] else "否"
-                    default = col['default'] if col['default'] else "-"
-                    f.write(f"| {col['name']} | {col['data_type']} | {nullable} | {default} | - |\n")
-                f.write("\n")
-
-                # 约束信息
-                if table['constraints']:
-                    f.write("#### 约束\n\n")
-                    for constraint in table['constraints']:
-                        f.write(f"- **{constraint['name']}** ({constraint['type']})")
-                        if constraint['column']:
-                            f.write(f": {constraint['column']}")
-                        f.write("\n")
-                    f.write("\n")
-
-                # 索引信息
-                if table['indexes']:
-                    f.write("#### 索引\n\n")
-                    for index in table['indexes']:
-                        f.write(f"- **{index['name']}**: {index['definition']}\n")
-                    f.write("\n")
-
-                # 外键信息
-                if table['foreign_keys']:
-                    f.write("#### 外键\n\n")
-                    for fk in table['foreign_keys']:
-                        f.write(f"- **{fk['column']}** → {fk['referenced_table']}.{fk['referenced_column']}\n")
-                    f.write("\n")
-
-                f.write(f"**行数**: {table['row_count']} | **大小**: {table['table_size']}\n\n")
-                f.write("---\n\n")
-
-            # 外键关系图
-            f.write("## 🔗 外键关系\n\n")
-            for rel in structure['foreign_key_relationships']:
-                f.write(f"- {rel['from_table']}.{rel['from_column']} → {rel['to_table']}.{rel['to_column']}\n")
-
-        print(f"✅ 分析报告已保存到: {filename}")
-        return filename
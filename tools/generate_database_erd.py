@@ -9,144 +9,165 @@
 """
 
 import json
+import os
 from datetime import datetime
+from itertools import chain, islice
+from pathlib import Path
+
+try:
+    import orjson  # 可选依赖：C实现的JSON解析，结构文件较大时明显更快
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # 可选依赖：读取同名 .msgpack 二进制结构文件
+except ImportError:
+    msgpack = None
 
 def load_database_structure(json_file: str) -> dict:
-    """加载数据库结构JSON文件"""
+    """加载数据库结构JSON文件
+
+    安装了 msgpack 且存在同名的 .msgpack 文件时优先读取它，否则读取JSON。
+    """
+    if msgpack is not None:
+        msgpack_file = Path(json_file).with_suffix('.msgpack')
+        if msgpack_file.exists():
+            return msgpack.unpackb(msgpack_file.read_bytes(), raw=False)
+    if orjson is not None:
+        with open(json_file, 'rb') as f:
+            return orjson.loads(f.read())
     with open(json_file, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def generate_mermaid_erd(data: dict) -> str:
-    """生成Mermaid ER图"""
-    
-    mermaid_lines = [
-        "erDiagram",
-        ""
-    ]
-    
-    tables = data['tables']
-    
-    # 定义表和字段
-    for table_name, table_info in tables.items():
-        if table_name == 'alembic_version':  # 跳过系统表
-            continue
-            
-        # 表定义
-        mermaid_lines.append(f"    {table_name.upper()} {{")
-        
-        for column in table_info['columns']:
-            col_name = column['column_name']
-            data_type = column['data_type']
-            
-            # 简化数据类型显示
-            if data_type == 'character varying':
-                data_type = 'varchar'
-            elif data_type == 'timestamp with time zone':
-                data_type = 'timestamp'
-            elif data_type == 'uuid':
-                data_type = 'uuid'
-            elif data_type == 'numeric':
-                data_type = 'decimal'
-            
-            # 添加约束标记
-            constraints = []
-            if column['is_primary_key']:
-                constraints.append('PK')
-            if column['is_foreign_key']:
-                constraints.append('FK')
-            if not column['is_nullable']:
-                constraints.append('NOT NULL')
-            
-            constraint_str = f" {','.join(constraints)}" if constraints else ""
-            
-            mermaid_lines.append(f"        {data_type} {col_name}{constraint_str}")
-        
-        mermaid_lines.append("    }")
-        mermaid_lines.append("")
-    
-    # 定义关系
-    relationships = []
-    
-    for table_name, table_info in tables.items():
-        if table_name == 'alembic_version':
-            continue
-            
-        for column in table_info['columns']:
-            if column['is_foreign_key'] and column['foreign_table']:
-                foreign_table = column['foreign_table']
-                if foreign_table != 'alembic_version':
-                    # 确定关系类型
-                    relationship_type = "||--o{"  # 一对多关系
-                    
-                    # 特殊关系处理
-                    if table_name == 'user_profiles' and foreign_table == 'users':
-                        relationship_type = "||--||"  # 一对一关系
-                    
-                    relationship = f"    {foreign_table.upper()} {relationship_type} {table_name.upper()} : has"
-                    if relationship not in relationships:
-                        relationships.append(relationship)
-    
-    mermaid_lines.extend(relationships)
-    
-    return "\n".join(mermaid_lines)
+# 完整版ER图的数据类型简化
+FULL_TYPE_MAPPING = {
+    'character varying': 'varchar',
+    'timestamp with time zone': 'timestamp',
+    'uuid': 'uuid',
+    'numeric': 'decimal'
+}
+
+# 简化版ER图的数据类型映射
+SIMPLE_TYPE_MAPPING = {
+    'character varying': 'varchar',
+    'timestamp with time zone': 'timestamp',
+    'uuid': 'uuid',
+    'numeric': 'decimal',
+    'integer': 'int',
+    'boolean': 'bool',
+    'text': 'text',
+    'date': 'date',
+    'jsonb': 'json'
+}
+
+# 简化版ER图的核心字段映射（frozenset 使逐列的成员判断为 O(1)）
+CORE_FIELDS = {
+    'users': frozenset(('id', 'username', 'created_at')),
+    'user_profiles': frozenset(('id', 'user_id', 'real_name', 'email', 'phone')),
+    'accounts': frozenset(('id', 'user_id', 'account_number', 'account_type', 'balance')),
+    'transactions': frozenset(('id', 'account_id', 'transaction_type', 'amount', 'timestamp')),
+    'investment_products': frozenset(('id', 'product_code', 'name', 'product_type', 'risk_level')),
+    'investment_holdings': frozenset(('id', 'user_id', 'product_id', 'shares', 'current_value')),
+    'investment_transactions': frozenset(('id', 'user_id', 'product_id', 'transaction_type', 'amount')),
+    'product_nav_history': frozenset(('id', 'product_id', 'nav_date', 'unit_nav')),
+    'user_risk_assessments': frozenset(('id', 'user_id', 'risk_tolerance', 'assessment_score'))
+}
+
+# 不参与ER图的系统表
+EXCLUDED_TABLES = frozenset(('alembic_version',))
+
+# 业务模块：(模块名, 模块内的表, 除主外键外需要展示的关键字段)
+BUSINESS_MODULES = (
+    ("用户管理模块", ('users', 'user_profiles', 'user_risk_assessments'),
+     frozenset(('username', 'real_name', 'email', 'risk_tolerance'))),
+    ("账户管理模块", ('accounts', 'transactions'),
+     frozenset(('account_number', 'balance', 'amount', 'transaction_type'))),
+    ("投资理财模块", ('investment_products', 'investment_holdings', 'investment_transactions', 'product_nav_history'),
+     frozenset(('product_code', 'name', 'shares', 'amount', 'unit_nav'))),
+)
+
+# 业务模块ER图的关系（固定内容）
+BUSINESS_RELATIONSHIPS = (
+    "",
+    "    %% 关系定义",
+    "    USERS ||--|| USER_PROFILES : \"1:1\"",
+    "    USERS ||--o{ ACCOUNTS : \"1:N\"",
+    "    USERS ||--o{ USER_RISK_ASSESSMENTS : \"1:N\"",
+    "    ACCOUNTS ||--o{ TRANSACTIONS : \"1:N\"",
+    "    USERS ||--o{ INVESTMENT_HOLDINGS : \"1:N\"",
+    "    INVESTMENT_PRODUCTS ||--o{ INVESTMENT_HOLDINGS : \"1:N\"",
+    "    INVESTMENT_PRODUCTS ||--o{ INVESTMENT_TRANSACTIONS : \"1:N\"",
+    "    INVESTMENT_PRODUCTS ||--o{ PRODUCT_NAV_HISTORY : \"1:N\"",
+    "    INVESTMENT_HOLDINGS ||--o{ INVESTMENT_TRANSACTIONS : \"1:N\"",
+)
+
+def _constraint_suffix(constraints: list) -> str:
+    """格式化字段约束标记"""
+    return f" {','.join(constraints)}" if constraints else ""
+
+def _emit_business_table(table_name: str, columns: list, key_names: frozenset):
+    """逐行生成业务模块ER图中的一个表"""
+    yield f"    {table_name.upper()} {{"
+    key_fields = (
+        col for col in columns
+        if col['is_primary_key'] or col['is_foreign_key'] or col['column_name'] in key_names
+    )
+    for column in islice(key_fields, 6):  # 限制显示字段数
+        data_type = column['data_type'].replace('character varying', 'varchar')
+        constraints = []
+        if column['is_primary_key']:
+            constraints.append('PK')
+        if column['is_foreign_key']:
+            constraints.append('FK')
+        yield f"        {data_type} {column['column_name']}{_constraint_suffix(constraints)}"
+    yield "    }"
 
-def generate_simplified_erd(data: dict) -> str:
-    """生成简化版ER图，只显示主要字段"""
+def _emit_business_modules(tables: dict):
+    """按模块顺序逐行生成业务模块ER图的表定义"""
+    for index, (module_name, module_tables, key_names) in enumerate(BUSINESS_MODULES):
+        if index:
+            yield ""
+        yield f"    %% {module_name}"
+        for table_name in module_tables:
+            table_info = tables.get(table_name)
+            if table_info is not None:
+                yield from _emit_business_table(table_name, table_info['columns'], key_names)
+
+def generate_all_erds(table_items: tuple) -> tuple:
+    """单次遍历所有表，同时生成完整版、简化版和业务模块ER图
+
+    Args:
+        table_items: 已剔除系统表的 (表名, 表信息) 序列
+
+    Returns:
+        (完整版, 简化版, 业务模块版) 三个Mermaid文本
+    """
     
-    mermaid_lines = [
-        "erDiagram",
-        ""
-    ]
+    upper_map = {name: name.upper() for name, _ in table_items}
     
-    tables = data['tables']
+    full_lines = ["erDiagram", ""]
+    simple_lines = ["erDiagram", ""]
     
-    # 定义核心字段映射
-    core_fields = {
-        'users': ['id', 'username', 'created_at'],
-        'user_profiles': ['id', 'user_id', 'real_name', 'email', 'phone'],
-        'accounts': ['id', 'user_id', 'account_number', 'account_type', 'balance'],
-        'transactions': ['id', 'account_id', 'transaction_type', 'amount', 'timestamp'],
-        'investment_products': ['id', 'product_code', 'name', 'product_type', 'risk_level'],
-        'investment_holdings': ['id', 'user_id', 'product_id', 'shares', 'current_value'],
-        'investment_transactions': ['id', 'user_id', 'product_id', 'transaction_type', 'amount'],
-        'product_nav_history': ['id', 'product_id', 'nav_date', 'unit_nav'],
-        'user_risk_assessments': ['id', 'user_id', 'risk_tolerance', 'assessment_score']
-    }
+    # 关系（dict 的键同时负责去重和保持插入顺序）
+    full_relationships = {}
+    simple_relationships = {}
     
-    # 定义表和核心字段
-    for table_name, table_info in tables.items():
-        if table_name == 'alembic_version':
-            continue
-            
-        mermaid_lines.append(f"    {table_name.upper()} {{")
+    for table_name, table_info in table_items:
+        table_upper = upper_map[table_name]
+        cols = table_info['columns']
         
-        # 获取核心字段列表
-        fields_to_show = core_fields.get(table_name, [])
+        # 获取简化版核心字段列表，没有预定义时显示前5个字段
+        fields_to_show = CORE_FIELDS.get(table_name)
         if not fields_to_show:
-            # 如果没有预定义，显示前5个字段
-            fields_to_show = [col['column_name'] for col in table_info['columns'][:5]]
+            fields_to_show = frozenset(col['column_name'] for col in cols[:5])
         
-        for column in table_info['columns']:
-            if column['column_name'] not in fields_to_show:
-                continue
-                
+        full_lines.append(f"    {table_upper} {{")
+        simple_lines.append(f"    {table_upper} {{")
+        
+        for column in cols:
             col_name = column['column_name']
             data_type = column['data_type']
             
-            # 简化数据类型
-            type_mapping = {
-                'character varying': 'varchar',
-                'timestamp with time zone': 'timestamp',
-                'uuid': 'uuid',
-                'numeric': 'decimal',
-                'integer': 'int',
-                'boolean': 'bool',
-                'text': 'text',
-                'date': 'date',
-                'jsonb': 'json'
-            }
-            data_type = type_mapping.get(data_type, data_type)
-            
             # 添加约束标记
             constraints = []
             if column['is_primary_key']:
@@ -154,179 +175,71 @@ def generate_simplified_erd(data: dict) -> str:
             if column['is_foreign_key']:
                 constraints.append('FK')
             
-            constraint_str = f" {','.join(constraints)}" if constraints else ""
-            
-            mermaid_lines.append(f"        {data_type} {col_name}{constraint_str}")
-        
-        mermaid_lines.append("    }")
-        mermaid_lines.append("")
-    
-    # 定义关系
-    relationships = []
-    
-    for table_name, table_info in tables.items():
-        if table_name == 'alembic_version':
-            continue
-            
-        for column in table_info['columns']:
-            if column['is_foreign_key'] and column['foreign_table']:
-                foreign_table = column['foreign_table']
-                if foreign_table != 'alembic_version':
-                    # 确定关系类型和标签
-                    if table_name == 'user_profiles' and foreign_table == 'users':
-                        relationship = f"    {foreign_table.upper()} ||--|| {table_name.upper()} : \"1:1\""
-                    elif foreign_table == 'users':
-                        relationship = f"    {foreign_table.upper()} ||--o{{ {table_name.upper()} : \"1:N\""
-                    elif foreign_table == 'accounts':
-                        relationship = f"    {foreign_table.upper()} ||--o{{ {table_name.upper()} : \"1:N\""
-                    elif foreign_table == 'investment_products':
-                        relationship = f"    {foreign_table.upper()} ||--o{{ {table_name.upper()} : \"1:N\""
-                    elif foreign_table == 'investment_holdings':
-                        relationship = f"    {foreign_table.upper()} ||--o{{ {table_name.upper()} : \"1:N\""
-                    else:
-                        relationship = f"    {foreign_table.upper()} ||--o{{ {table_name.upper()} : \"references\""
-                    
-                    if relationship not in relationships:
-                        relationships.append(relationship)
-    
-    mermaid_lines.extend(relationships)
-    
-    return "\n".join(mermaid_lines)
-
-def generate_business_module_erd(data: dict) -> str:
-    """生成按业务模块分组的ER图"""
-    
-    mermaid_lines = [
-        "erDiagram",
-        "",
-        "    %% 用户管理模块",
-    ]
-    
-    # 用户管理模块
-    user_tables = ['users', 'user_profiles', 'user_risk_assessments']
-    for table_name in user_tables:
-        if table_name in data['tables']:
-            table_info = data['tables'][table_name]
-            mermaid_lines.append(f"    {table_name.upper()} {{")
-            
-            # 显示关键字段
-            key_fields = []
-            for col in table_info['columns']:
-                if (col['is_primary_key'] or col['is_foreign_key'] or 
-                    col['column_name'] in ['username', 'real_name', 'email', 'risk_tolerance']):
-                    key_fields.append(col)
-            
-            for column in key_fields[:6]:  # 限制显示字段数
-                col_name = column['column_name']
-                data_type = column['data_type'].replace('character varying', 'varchar')
-                
-                constraints = []
-                if column['is_primary_key']:
-                    constraints.append('PK')
-                if column['is_foreign_key']:
-                    constraints.append('FK')
-                
-                constraint_str = f" {','.join(constraints)}" if constraints else ""
-                mermaid_lines.append(f"        {data_type} {col_name}{constraint_str}")
-            
-            mermaid_lines.append("    }")
-    
-    mermaid_lines.extend([
-        "",
-        "    %% 账户管理模块",
-    ])
-    
-    # 账户管理模块
-    account_tables = ['accounts', 'transactions']
-    for table_name in account_tables:
-        if table_name in data['tables']:
-            table_info = data['tables'][table_name]
-            mermaid_lines.append(f"    {table_name.upper()} {{")
+            if col_name in fields_to_show:
+                simple_type = SIMPLE_TYPE_MAPPING.get(data_type, data_type)
+                simple_lines.append(f"        {simple_type} {col_name}{_constraint_suffix(constraints)}")
             
-            key_fields = []
-            for col in table_info['columns']:
-                if (col['is_primary_key'] or col['is_foreign_key'] or 
-                    col['column_name'] in ['account_number', 'balance', 'amount', 'transaction_type']):
-                    key_fields.append(col)
-            
-            for column in key_fields[:6]:
-                col_name = column['column_name']
-                data_type = column['data_type'].replace('character varying', 'varchar')
-                
-                constraints = []
-                if column['is_primary_key']:
-                    constraints.append('PK')
-                if column['is_foreign_key']:
-                    constraints.append('FK')
-                
-                constraint_str = f" {','.join(constraints)}" if constraints else ""
-                mermaid_lines.append(f"        {data_type} {col_name}{constraint_str}")
-            
-            mermaid_lines.append("    }")
-    
-    mermaid_lines.extend([
-        "",
-        "    %% 投资理财模块",
-    ])
-    
-    # 投资理财模块
-    investment_tables = ['investment_products', 'investment_holdings', 'investment_transactions', 'product_nav_history']
-    for table_name in investment_tables:
-        if table_name in data['tables']:
-            table_info = data['tables'][table_name]
-            mermaid_lines.append(f"    {table_name.upper()} {{")
+            if not column['is_nullable']:
+                constraints.append('NOT NULL')
+            full_type = FULL_TYPE_MAPPING.get(data_type, data_type)
+            full_lines.append(f"        {full_type} {col_name}{_constraint_suffix(constraints)}")
             
-            key_fields = []
-            for col in table_info['columns']:
-                if (col['is_primary_key'] or col['is_foreign_key'] or 
-                    col['column_name'] in ['product_code', 'name', 'shares', 'amount', 'unit_nav']):
-                    key_fields.append(col)
+            # 定义关系
+            foreign_table = column['foreign_table'] if column['is_foreign_key'] else None
+            if not foreign_table or foreign_table in EXCLUDED_TABLES:
+                continue
             
-            for column in key_fields[:6]:
-                col_name = column['column_name']
-                data_type = column['data_type'].replace('character varying', 'varchar')
-                
-                constraints = []
-                if column['is_primary_key']:
-                    constraints.append('PK')
-                if column['is_foreign_key']:
-                    constraints.append('FK')
-                
-                constraint_str = f" {','.join(constraints)}" if constraints else ""
-                mermaid_lines.append(f"        {data_type} {col_name}{constraint_str}")
+            foreign_upper = upper_map.get(foreign_table) or foreign_table.upper()
+            if table_name == 'user_profiles' and foreign_table == 'users':
+                # 一对一关系
+                full_relationship = f"    {foreign_upper} ||--|| {table_upper} : has"
+                simple_relationship = f"    {foreign_upper} ||--|| {table_upper} : \"1:1\""
+            else:
+                # 一对多关系
+                full_relationship = f"    {foreign_upper} ||--o{{ {table_upper} : has"
+                if foreign_table in ('users', 'accounts', 'investment_products', 'investment_holdings'):
+                    simple_relationship = f"    {foreign_upper} ||--o{{ {table_upper} : \"1:N\""
+                else:
+                    simple_relationship = f"    {foreign_upper} ||--o{{ {table_upper} : \"references\""
             
-            mermaid_lines.append("    }")
-    
-    # 添加关系
-    mermaid_lines.extend([
-        "",
-        "    %% 关系定义",
-        "    USERS ||--|| USER_PROFILES : \"1:1\"",
-        "    USERS ||--o{ ACCOUNTS : \"1:N\"",
-        "    USERS ||--o{ USER_RISK_ASSESSMENTS : \"1:N\"",
-        "    ACCOUNTS ||--o{ TRANSACTIONS : \"1:N\"",
-        "    USERS ||--o{ INVESTMENT_HOLDINGS : \"1:N\"",
-        "    INVESTMENT_PRODUCTS ||--o{ INVESTMENT_HOLDINGS : \"1:N\"",
-        "    INVESTMENT_PRODUCTS ||--o{ INVESTMENT_TRANSACTIONS : \"1:N\"",
-        "    INVESTMENT_PRODUCTS ||--o{ PRODUCT_NAV_HISTORY : \"1:N\"",
-        "    INVESTMENT_HOLDINGS ||--o{ INVESTMENT_TRANSACTIONS : \"1:N\"",
-    ])
-    
-    return "\n".join(mermaid_lines)
+            full_relationships[full_relationship] = None
+            simple_relationships[simple_relationship] = None
+        
+        full_lines.append("    }")
+        full_lines.append("")
+        simple_lines.append("    }")
+        simple_lines.append("")
+    
+    full_lines.extend(full_relationships)
+    simple_lines.extend(simple_relationships)
+    
+    # 业务模块ER图：按模块顺序流式拼装，再接上固定的关系定义
+    business_erd = "\n".join(chain(
+        ("erDiagram", ""),
+        _emit_business_modules(dict(table_items)),
+        BUSINESS_RELATIONSHIPS,
+    ))
+    
+    return "\n".join(full_lines), "\n".join(simple_lines), business_erd
 
 def main():
     """主函数"""
     print("🏦 数脉银行数据库ER图生成工具")
     print("=" * 50)
     
-    # 查找最新的JSON文件
-    import glob
-    json_files = glob.glob("database_structure_*.json")
-    if not json_files:
+    # 查找最新的JSON文件（单次目录扫描，按修改时间取最新）
+    with os.scandir('.') as entries:
+        latest_entry = max(
+            (entry for entry in entries
+             if entry.name.startswith('database_structure_') and entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime,
+            default=None
+        )
+    if latest_entry is None:
         print("未找到数据库结构JSON文件，请先运行 analyze_database_structure.py")
         return 1
     
-    latest_file = max(json_files)
+    latest_file = latest_entry.name
     print(f"使用数据文件: {latest_file}")
     
     # 加载数据
@@ -335,20 +248,17 @@ def main():
     # 生成不同版本的ER图
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
-    # 1. 完整ER图
-    full_erd = generate_mermaid_erd(data)
-    with open(f"database_erd_full_{timestamp}.mmd", 'w', encoding='utf-8') as f:
-        f.write(full_erd)
-    
-    # 2. 简化ER图
-    simple_erd = generate_simplified_erd(data)
-    with open(f"database_erd_simple_{timestamp}.mmd", 'w', encoding='utf-8') as f:
-        f.write(simple_erd)
-    
-    # 3. 业务模块ER图
-    business_erd = generate_business_module_erd(data)
-    with open(f"database_erd_business_{timestamp}.mmd", 'w', encoding='utf-8') as f:
-        f.write(business_erd)
+    # 系统表只在这里过滤一次
+    table_items = tuple(
+        (name, info) for name, info in data['tables'].items()
+        if name not in EXCLUDED_TABLES
+    )
+    full_erd, simple_erd, business_erd = generate_all_erds(table_items)
+    
+    # 完整、简化、业务模块ER图各编码一次，整体写入（不经过文本模式逐段编码）
+    Path(f"database_erd_full_{timestamp}.mmd").write_bytes(full_erd.encode('utf-8'))
+    Path(f"database_erd_simple_{timestamp}.mmd").write_bytes(simple_erd.encode('utf-8'))
+    Path(f"database_erd_business_{timestamp}.mmd").write_bytes(business_erd.encode('utf-8'))
     
     print(f"\n📊 ER图生成完成:")
     print(f"- 完整版: database_erd_full_{timestamp}.mmd")